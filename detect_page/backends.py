@@ -0,0 +1,293 @@
+"""
+Inference backends for the anomaly and defect models.
+
+- ``torch``: the ultralytics PyTorch weights (``.pt``), on CPU or CUDA
+- ``onnx``: an ONNX export run by ONNX Runtime
+- ``openvino``: an OpenVINO IR export, the fastest option on Intel CPUs
+
+Exports are written next to the ``.pt`` file under the names ultralytics
+uses (``x.onnx``, ``x_openvino_model/``) and are created on first use. Each
+export is then compared with the PyTorch model on the images in
+``screenshots/``; the report is kept next to it (``x.onnx.parity.json``).
+An export that fails the check, or cannot be checked because there are no
+images yet, is not used; the engine falls back to PyTorch instead.
+``onnx``/``onnxruntime`` and ``openvino`` are only needed for those backends. ultralytics (and with it torch) is imported on first use.
+
+Export a profile's weights and compare them with the PyTorch outputs:
+
+    python -m detect_page.backends --profile cpu-n --backend openvino --check screenshots
+
+which re-exports the weights and overwrites the saved parity reports.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "openvino")
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".webp")
+PARITY_IMAGE_DIR = "screenshots"
+
+
+def exported_path(weights_path, backend, int8=False):
+    """Path of the export of ``weights_path`` for ``backend``."""
+    stem = os.path.splitext(weights_path)[0]
+    if backend == "torch":
+        return weights_path
+    if backend == "onnx":
+        return f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def export_model(weights_path, backend, imgsz=640, int8=False, data=None):
+    """Export PyTorch weights for ``backend`` and return the exported path.
+
+    ``data`` is the dataset YAML used to calibrate INT8 exports.
+    """
+    from ultralytics import YOLO
+
+    if backend == "torch":
+        return weights_path
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    kwargs = {"format": backend, "imgsz": imgsz, "dynamic": True}
+    if int8:
+        kwargs.update(int8=True, data=data)
+    path = YOLO(weights_path).export(**kwargs)
+    print(f"[INFO] Exported {weights_path} -> {path}")
+    return path
+
+
+def load_model(
+    weights_path, backend="torch", device="cpu", int8=False, check_dir=PARITY_IMAGE_DIR
+):
+    """
+    Load a YOLO model for ``backend``, exporting the weights if needed.
+
+    Falls back to the PyTorch weights when the export failed its parity check
+    or could not be checked because ``check_dir`` has no images.
+    """
+    from ultralytics import YOLO
+
+    if backend == "torch":
+        return YOLO(weights_path).to(device)
+    path = exported_path(weights_path, backend, int8=int8)
+    if not os.path.exists(path):
+        if int8:
+            raise FileNotFoundError(
+                f"{path} not found; build it with python -m detect_page.quantize"
+            )
+        path = export_model(weights_path, backend)
+
+    report = load_parity_report(path)
+    if report is None:
+        report = check_export(weights_path, path, check_dir)
+    if report is None:
+        print(
+            f"[WARNING] {path} has not passed a parity check; "
+            "using the PyTorch weights"
+        )
+        return YOLO(weights_path).to(device)
+    if not report["passed"]:
+        print(
+            f"[WARNING] {path} failed the parity check ({format_report(report)}); "
+            "using the PyTorch weights"
+        )
+        return YOLO(weights_path).to(device)
+    return YOLO(path, task="detect")
+
+
+def parity_report_path(path):
+    return f"{path.rstrip(os.sep)}.parity.json"
+
+
+def load_parity_report(path):
+    """Return the saved parity report of an export, or None."""
+    report_path = parity_report_path(path)
+    if not os.path.exists(report_path):
+        return None
+    with open(report_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_export(weights_path, path, check_dir=PARITY_IMAGE_DIR, **thresholds):
+    """
+    Compare an export with its PyTorch weights and save the report.
+
+    Returns None (and saves nothing, so the check runs again next time) when
+    ``check_dir`` has no images.
+    """
+    from ultralytics import YOLO
+
+    images = load_check_images(check_dir) if os.path.isdir(check_dir) else []
+    if not images:
+        print(f"[WARNING] No images in {check_dir}; parity check of {path} skipped")
+        return None
+    report = parity_check(
+        YOLO(weights_path).to("cpu"), YOLO(path, task="detect"), images, **thresholds
+    )
+    with open(parity_report_path(path), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[INFO] Parity check of {path}: {format_report(report)}")
+    return report
+
+
+def _box_iou(box, boxes):
+    """IoU of one xyxy box against an (N, 4) array of boxes."""
+    x0 = np.maximum(box[0], boxes[:, 0])
+    y0 = np.maximum(box[1], boxes[:, 1])
+    x1 = np.minimum(box[2], boxes[:, 2])
+    y1 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def _result_arrays(result):
+    boxes = result.boxes
+    return (
+        boxes.xyxy.cpu().numpy().reshape(-1, 4),
+        boxes.conf.cpu().numpy().reshape(-1),
+        boxes.cls.cpu().numpy().reshape(-1).astype(int),
+    )
+
+
+def compare_results(reference_results, candidate_results, iou_threshold=0.5):
+    """
+    Match candidate boxes to reference boxes per image and class.
+
+    Returns a dict with how many reference boxes were recovered (recall), how
+    many candidate boxes had a reference box (precision), the mean IoU and the
+    largest confidence difference of the matched pairs.
+    """
+    matched = missing = extra = 0
+    ious = []
+    conf_diffs = []
+    for reference, candidate in zip(reference_results, candidate_results):
+        ref_xyxy, ref_conf, ref_cls = _result_arrays(reference)
+        cand_xyxy, cand_conf, cand_cls = _result_arrays(candidate)
+        used = np.zeros(len(cand_xyxy), dtype=bool)
+        for i in np.argsort(-ref_conf):
+            candidates = np.flatnonzero((cand_cls == ref_cls[i]) & ~used)
+            if len(candidates) == 0:
+                missing += 1
+                continue
+            iou = _box_iou(ref_xyxy[i], cand_xyxy[candidates])
+            best = int(np.argmax(iou))
+            if iou[best] < iou_threshold:
+                missing += 1
+                continue
+            used[candidates[best]] = True
+            matched += 1
+            ious.append(float(iou[best]))
+            conf_diffs.append(abs(float(ref_conf[i] - cand_conf[candidates[best]])))
+        extra += int((~used).sum())
+
+    reference_total = matched + missing
+    candidate_total = matched + extra
+    return {
+        "reference_boxes": reference_total,
+        "matched": matched,
+        "missing": missing,
+        "extra": extra,
+        "recall": matched / reference_total if reference_total else 1.0,
+        "precision": matched / candidate_total if candidate_total else 1.0,
+        "mean_iou": float(np.mean(ious)) if ious else 1.0,
+        "max_conf_diff": max(conf_diffs) if conf_diffs else 0.0,
+    }
+
+
+def parity_check(
+    reference_model,
+    candidate_model,
+    images,
+    min_match=0.95,
+    max_conf_diff=0.05,
+    batch_size=8,
+):
+    """
+    Run both models on ``images`` and check the candidate reproduces the reference.
+
+    At least ``min_match`` of the reference boxes must be found (recall) and
+    of the candidate boxes must be matched (precision).
+    """
+    reference_results = []
+    candidate_results = []
+    for start in range(0, len(images), batch_size):
+        batch = images[start : start + batch_size]
+        reference_results.extend(reference_model.predict(batch, verbose=False))
+        candidate_results.extend(candidate_model.predict(batch, verbose=False))
+
+    report = compare_results(reference_results, candidate_results)
+    report["images"] = len(images)
+    report["passed"] = (
+        report["recall"] >= min_match
+        and report["precision"] >= min_match
+        and report["max_conf_diff"] <= max_conf_diff
+    )
+    return report
+
+
+def read_images(paths, size=640):
+    """Read images resized to the model input size, skipping unreadable files."""
+    images = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is not None:
+            images.append(cv2.resize(img, (size, size)))
+    return images
+
+
+def load_check_images(folder, limit=64, size=640):
+    """Read up to ``limit`` images of a folder."""
+    names = sorted(n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTS))
+    return read_images([os.path.join(folder, n) for n in names[:limit]], size)
+
+
+def format_report(report):
+    status = "OK" if report["passed"] else "FAILED"
+    return (
+        f"{status}: {report['matched']}/{report['reference_boxes']} boxes matched "
+        f"(recall {report['recall']:.3f}, precision {report['precision']:.3f}), "
+        f"mean IoU {report['mean_iou']:.3f}, "
+        f"max conf diff {report['max_conf_diff']:.3f} on {report['images']} images"
+    )
+
+
+def main(argv=None):
+    from detect_page.engine import PROFILES, weights_path
+
+    parser = argparse.ArgumentParser(
+        description="Export detection weights to ONNX Runtime / OpenVINO and check parity."
+    )
+    parser.add_argument("--profile", default="cpu-n", choices=sorted(PROFILES))
+    parser.add_argument(
+        "--backend", default="openvino", choices=[b for b in BACKENDS if b != "torch"]
+    )
+    parser.add_argument(
+        "--check",
+        metavar="FOLDER",
+        help="Compare against the PyTorch model on the images of this folder",
+    )
+    args = parser.parse_args(argv)
+
+    profile = PROFILES[args.profile]
+    passed = True
+    for weights in (profile.anomaly_weights, profile.defect_weights):
+        path = weights_path(weights)
+        exported = export_model(path, args.backend)
+        if args.check:
+            report = check_export(path, exported, args.check)
+            passed = passed and report is not None and report["passed"]
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
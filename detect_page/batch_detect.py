@@ -0,0 +1,448 @@
+"""
+Headless batch detection for recorded videos and image folders.
+
+Runs the same anomaly + defect engine as the detection pages, without Qt
+or file dialogs. It writes the same detect_output CSVs (and database rows
+with --db) and prints throughput and per-stage timings at the end.
+
+Examples:
+
+    python -m detect_page.batch_detect recordings/coil_01.mp4 recordings/coil_02.mp4
+    python -m detect_page.batch_detect recordings/ --profile cpu-n --workers 4
+    python -m detect_page.batch_detect recordings/ --profile cpu-n --backend openvino
+    python -m detect_page.batch_detect screenshots/line3 --db
+
+A directory containing videos is expanded to those videos. Any other
+directory is processed as an image folder: every image goes through the
+anomaly and defect models and is written like a capture.
+"""
+
+import argparse
+import ast
+import copy
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import torch
+
+from detect_page.backends import BACKENDS
+from detect_page.cascade import DEFECT_MODES, cascade_defects
+from detect_page.capture_policy import CAPTURE_POLICIES, capture_policy_factory
+from detect_page.capture_sink import CaptureSink, defect_detections
+from detect_page.engine import (
+    DETECT_OUTPUT_DIR,
+    PROFILES,
+    DetectionEngine,
+    create_db_engine,
+    create_tiler,
+    load_models,
+)
+from detect_page.image_writer import IMAGE_FORMATS, format_write_stats
+from detect_page.metrics import StageTimings, format_timings, merge_timings
+from detect_page.pipeline import YOLO_INPUT_SIZE, extract_detections, predict_batched
+from detect_page.scheduler import SCHEDULE_POLICIES
+from detect_page.tiling import INFERENCE_MODES
+
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv", ".wmv")
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".webp")
+
+# Per-process state for --workers > 1
+_worker_state = {}
+
+
+def expand_inputs(paths):
+    """Expand directories of videos into video files; keep image folders as-is."""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos = sorted(
+                os.path.join(path, f)
+                for f in os.listdir(path)
+                if f.lower().endswith(VIDEO_EXTS)
+            )
+            inputs.extend(videos or [path])
+        else:
+            inputs.append(path)
+    return inputs
+
+
+def run_video(video_path, profile, models, db_engine=None, schedule_policy="every"):
+    """Process one video to completion and return its run summary."""
+    anomaly_model, defect_model = models
+    finished = threading.Event()
+    engine = DetectionEngine(
+        profile,
+        anomaly_model,
+        defect_model,
+        on_frame=lambda packet: None,
+        on_finished=finished.set,
+        db_engine=db_engine,
+    )
+    start = time.time()
+    engine.start(
+        video_path,
+        display_size=None,
+        schedule_policy=schedule_policy,
+        render=False,
+        # Every capture is classified; a slow defect model slows the run
+        block_captures=True,
+    )
+    # Also return if the inference thread died on an error
+    while not finished.wait(timeout=1.0):
+        if not engine.pipeline.is_alive():
+            break
+    stats = engine.stop()
+    defect_stats = engine.defect_stats()
+    image_stats = engine.sink.image_stats.summary()
+    return {
+        "input": video_path,
+        "frames": stats["processed"],
+        "gated": stats["gated"],
+        "captures": defect_stats["processed"],
+        "dropped_captures": defect_stats["dropped"],
+        "seconds": time.time() - start,
+        "timings": engine.timings.snapshot(),
+        "images": image_stats,
+        "output": engine.annotation_csv_path,
+    }
+
+
+def run_folder(folder, profile, models, db_engine=None, batch_size=8):
+    """Run anomaly + defect detection on every image of a folder."""
+    anomaly_model, defect_model = models
+    tiler = create_tiler(profile)
+    timings = StageTimings()
+    start = time.time()
+
+    base_name = os.path.basename(os.path.normpath(folder))
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    os.makedirs(DETECT_OUTPUT_DIR, exist_ok=True)
+    sink = CaptureSink(
+        os.path.join(DETECT_OUTPUT_DIR, f"{base_name}_{timestamp}_annotations.csv"),
+        db_engine=db_engine if profile.use_database else None,
+        draw_boxes=profile.draw_boxes_on_capture,
+        screenshot_dir=os.path.join("screenshots", base_name),
+        encoding=profile.image_encoding(),
+    )
+
+    img_files = sorted(
+        os.path.join(folder, f)
+        for f in os.listdir(folder)
+        if f.lower().endswith(IMAGE_EXTS)
+    )
+    frames = 0
+    for offset in range(0, len(img_files), batch_size):
+        names = []
+        originals = []
+        images = []
+        with timings.time("decode"):
+            for img_path in img_files[offset : offset + batch_size]:
+                img = cv2.imread(img_path)
+                if img is None:
+                    continue
+                names.append(os.path.splitext(os.path.basename(img_path))[0])
+                originals.append(img)
+                images.append(cv2.resize(img, (YOLO_INPUT_SIZE, YOLO_INPUT_SIZE)))
+        if not images:
+            continue
+
+        with timings.time("anomaly", count=len(images)):
+            if tiler is not None:
+                all_detections = [
+                    detections
+                    for detections, _ in tiler.predict(anomaly_model, originals)
+                ]
+            else:
+                all_detections = [
+                    extract_detections(result, anomaly_model.names)
+                    for result in predict_batched(anomaly_model, images)
+                ]
+        with timings.time("defect", count=len(images)):
+            if profile.defect_mode == "cascade":
+                all_defects = [
+                    cascade_defects(
+                        defect_model,
+                        original,
+                        detections,
+                        imgsz=profile.cascade_imgsz,
+                        margin=profile.cascade_margin,
+                    )
+                    for original, detections in zip(originals, all_detections)
+                ]
+            else:
+                all_defects = [
+                    defect_detections([result], defect_model.names)
+                    for result in predict_batched(defect_model, images)
+                ]
+
+        for name, original, detections, defects in zip(
+            names, originals, all_detections, all_defects
+        ):
+            with timings.time("persist"):
+                sink.write(original, detections, defects, image_name=name)
+        frames += len(images)
+    sink.flush()
+
+    return {
+        "input": folder,
+        "frames": frames,
+        "gated": 0,
+        "captures": frames,
+        "dropped_captures": 0,
+        "seconds": time.time() - start,
+        "timings": timings.snapshot(),
+        "images": sink.image_stats.summary(),
+        "output": sink.annotation_csv_path,
+    }
+
+
+def run_input(path, profile, models, db_engine, args):
+    if os.path.isdir(path):
+        return run_folder(path, profile, models, db_engine, args.batch_size)
+    return run_video(path, profile, models, db_engine, args.schedule)
+
+
+def _init_worker(profile, torch_threads):
+    """Load models (and the DB engine) once per worker process."""
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    _worker_state["profile"] = profile
+    _worker_state["models"] = load_models(profile)
+    _worker_state["db_engine"] = create_db_engine() if profile.use_database else None
+
+
+def _run_in_worker(path, args):
+    return run_input(
+        path,
+        _worker_state["profile"],
+        _worker_state["models"],
+        _worker_state["db_engine"],
+        args,
+    )
+
+
+def print_summary(summaries, wall_time):
+    for summary in summaries:
+        fps = summary["frames"] / summary["seconds"] if summary["seconds"] else 0
+        print(
+            f"[INFO] {summary['input']}: {summary['frames']} frames in "
+            f"{summary['seconds']:.1f} s ({fps:.2f} FPS), "
+            f"{summary['gated']} gated, {summary['captures']} captures, "
+            f"{summary['dropped_captures']} dropped -> {summary['output']}"
+        )
+        print(format_timings(summary["timings"]))
+        print(f"  images: {format_write_stats(summary['images'])}")
+
+    total_frames = sum(summary["frames"] for summary in summaries)
+    fps = total_frames / wall_time if wall_time else 0
+    print(
+        f"[INFO] Total: {len(summaries)} inputs, {total_frames} frames in "
+        f"{wall_time:.1f} s ({fps:.2f} FPS overall)"
+    )
+    print(format_timings(merge_timings(s["timings"] for s in summaries)))
+
+
+def parse_options(options):
+    """``["key=value", ...]`` to a dict; values are Python literals or strings."""
+    parsed = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        try:
+            parsed[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            parsed[key] = value
+    return parsed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run steel defect detection on videos or image folders without a GUI."
+    )
+    parser.add_argument("inputs", nargs="+", help="Video files or folders")
+    parser.add_argument(
+        "--profile",
+        default="gpu-s",
+        choices=sorted(PROFILES),
+        help="Detection profile (device, weights, capture policy)",
+    )
+    parser.add_argument(
+        "--schedule",
+        default="every",
+        choices=SCHEDULE_POLICIES,
+        help="Frame scheduling policy for videos (default: every frame)",
+    )
+    parser.add_argument(
+        "--db",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Write detections to the database from DB_URL (default: per profile)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        help="Inference backend (default: per profile)",
+    )
+    parser.add_argument(
+        "--int8",
+        action="store_true",
+        help="Use the INT8 OpenVINO models from detect_page.quantize",
+    )
+    parser.add_argument(
+        "--defect-mode",
+        choices=DEFECT_MODES,
+        help="Defect model on the full frame or on anomaly crops (default: per profile)",
+    )
+    parser.add_argument(
+        "--gate-threshold",
+        type=float,
+        help="Frame-difference gate threshold in gray levels, 0 disables "
+        "(default: per profile)",
+    )
+    parser.add_argument(
+        "--inference-mode",
+        choices=INFERENCE_MODES,
+        help="Anomaly model on the resized frame or on native tiles "
+        "(default: per profile)",
+    )
+    parser.add_argument("--tile-size", type=int, help="Tile size in pixels")
+    parser.add_argument(
+        "--tile-overlap", type=float, help="Overlap between tiles (fraction)"
+    )
+    parser.add_argument("--tile-batch", type=int, help="Tiles per predict() call")
+    parser.add_argument(
+        "--decode-process",
+        action="store_true",
+        help="Decode videos in a child process through shared memory",
+    )
+    parser.add_argument(
+        "--detection-log",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Log every frame's detections to history/*.dlog (default: per profile)",
+    )
+    parser.add_argument(
+        "--capture-policy",
+        choices=sorted(CAPTURE_POLICIES),
+        help="When captures are taken in videos (default: per profile)",
+    )
+    parser.add_argument(
+        "--capture-option",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Option of --capture-policy, e.g. position=0.5 (repeatable)",
+    )
+    parser.add_argument(
+        "--image-format",
+        choices=IMAGE_FORMATS,
+        help="Screenshot format, webp is lossless (default: per profile)",
+    )
+    parser.add_argument(
+        "--png-compression", type=int, help="PNG compression level 0-9"
+    )
+    parser.add_argument("--jpeg-quality", type=int, help="JPEG quality 0-100")
+    parser.add_argument(
+        "--frame-buffer-mb",
+        type=int,
+        help="Memory for recent decoded frames, 0 disables it (default: per profile)",
+    )
+    parser.add_argument(
+        "--clip-before",
+        type=float,
+        help="Seconds of video saved before each capture as a clip",
+    )
+    parser.add_argument(
+        "--clip-after",
+        type=float,
+        help="Seconds of video saved after each capture as a clip",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes; each loads its own models",
+    )
+    parser.add_argument(
+        "--torch-threads",
+        type=int,
+        default=0,
+        help="torch intra-op threads per process (0 keeps the default)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="Images per predict() call for image folders",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profile = copy.copy(PROFILES[args.profile])
+    if args.db is not None:
+        profile.use_database = args.db
+    if args.backend:
+        profile.backend = args.backend
+    if args.gate_threshold is not None:
+        profile.gate_threshold = args.gate_threshold or None
+    if args.inference_mode:
+        profile.inference_mode = args.inference_mode
+    for option in ("tile_size", "tile_overlap", "tile_batch"):
+        if getattr(args, option) is not None:
+            setattr(profile, option, getattr(args, option))
+    for option in (
+        "image_format",
+        "png_compression",
+        "jpeg_quality",
+        "frame_buffer_mb",
+        "clip_before",
+        "clip_after",
+    ):
+        if getattr(args, option) is not None:
+            setattr(profile, option, getattr(args, option))
+    if args.detection_log is not None:
+        profile.detection_log = args.detection_log
+    if args.capture_policy:
+        profile.capture_policy = capture_policy_factory(
+            args.capture_policy, **parse_options(args.capture_option)
+        )
+    if args.defect_mode:
+        profile.defect_mode = args.defect_mode
+    if args.decode_process:
+        profile.decode_process = True
+    if args.int8:
+        profile.backend = "openvino"
+        profile.int8 = True
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("[ERROR] No inputs found.")
+        return 1
+
+    start = time.time()
+    if args.workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(profile, args.torch_threads),
+        ) as pool:
+            summaries = list(pool.map(_run_in_worker, inputs, [args] * len(inputs)))
+    else:
+        if args.torch_threads:
+            torch.set_num_threads(args.torch_threads)
+        models = load_models(profile)
+        db_engine = create_db_engine() if profile.use_database else None
+        summaries = [
+            run_input(path, profile, models, db_engine, args) for path in inputs
+        ]
+
+    print_summary(summaries, time.time() - start)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
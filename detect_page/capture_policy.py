@@ -0,0 +1,376 @@
+"""
+Capture policies decide on which frames a screenshot is taken.
+
+A policy is created fresh for every run and sees every processed frame
+packet (see detect_page.pipeline) through ``update(packet)``, which returns
+True when the frame should be captured. The packet carries the frame's
+``detections`` (a DetectionBatch) and, from detect_page.tracker, its
+``tracks``; coordinates are in 640x640 model space. Besides deciding when, a policy decides what
+is captured by setting on the packet:
+
+- ``capture_detections``: the detections classified and written for the
+  capture (default: all of the frame's)
+- ``capture_index``: an earlier frame to capture instead, taken from the
+  engine's frame buffer (detect_page.frame_buffer)
+- ``capture_clip``: ``(seconds_before, seconds_after)`` of video to save
+  around the capture
+
+Every capture costs one defect-model call, so a policy that captures each
+defect once saves those calls. CapturePolicy documents the interface;
+``capture_policy_factory`` builds a profile's policy factory by name, so a
+new policy only has to be added to CAPTURE_POLICIES.
+"""
+
+import time
+from functools import partial
+
+import numpy as np
+
+from detect_page.motion import StripSpeedEstimator
+from detect_page.pipeline import YOLO_INPUT_SIZE
+
+
+def _tracked(detections, track_ids):
+    """Rows of ``detections`` that belong to one of ``track_ids``."""
+    return detections.select(np.isin(detections.track_id, list(track_ids)))
+
+
+class CapturePolicy:
+    """
+    Interface of the capture policies.
+
+    The engine calls ``update`` for every processed frame on the inference
+    thread, ``release`` when a capture was dropped because the defect queue
+    was full, and ``finish`` once when the run stops.
+    """
+
+    def reset(self):
+        """Forget all state (a policy is also created fresh for every run)."""
+
+    def update(self, packet):
+        """Return True to capture this frame (see the module docstring)."""
+        raise NotImplementedError
+
+    def release(self, packet):
+        """The capture requested for ``packet`` was dropped."""
+
+    def finish(self):
+        """A packet still to be captured at the end of the run, or None."""
+        return None
+
+
+class CenterCapturePolicy(CapturePolicy):
+    """
+    Capture when the leftmost anomaly is just left of the frame center.
+
+    After that capture, wait twice as long as the anomaly took to reach the
+    center and capture once more if anything is still visible.
+    """
+
+    def __init__(self, center_threshold=0.1):
+        # Fraction of the frame width; the target is shifted left by the same amount
+        self.center_threshold = center_threshold
+        self.reset()
+
+    def reset(self):
+        self.capture_state = "wait_defect_center"
+        self.capture_delay_until = 0
+        self.defect_first_seen_time = None
+
+    def update(self, packet):
+        detections = packet["detections"]
+        center_x = YOLO_INPUT_SIZE // 2
+        center_threshold = YOLO_INPUT_SIZE * self.center_threshold
+
+        # Leftmost anomaly
+        defect = (
+            detections.boxes[np.argmin(detections.boxes[:, 0])]
+            if len(detections)
+            else None
+        )
+
+        now = time.time()
+        if self.capture_state == "wait_defect_center":
+            if defect is None:
+                self.defect_first_seen_time = None
+                return False
+            x_center = (defect[0] + defect[2]) / 2
+            # Shift the center to the left by center_threshold
+            shifted_center_x = center_x - center_threshold
+            if self.defect_first_seen_time is None:
+                self.defect_first_seen_time = now
+            if abs(x_center - shifted_center_x) < center_threshold:
+                time_to_center = now - self.defect_first_seen_time
+                self.capture_delay_until = now + 2 * time_to_center
+                self.capture_state = "wait_delay"
+                self.defect_first_seen_time = None
+                return True
+            return False
+
+        if now >= self.capture_delay_until:
+            self.capture_state = "wait_defect_center"
+            return defect is not None
+        return False
+
+
+class TrackCapturePolicy(CapturePolicy):
+    """
+    Capture every confirmed track exactly once, when it reaches the target
+    line (the frame center shifted left by ``center_threshold``).
+
+    Needs ``packet["tracks"]`` from detect_page.tracker. A track that jumps
+    over the line between two processed frames still counts. Only the boxes
+    of the newly captured tracks are written for the capture, so a defect
+    that is still visible in a later capture is not stored twice.
+    """
+
+    def __init__(self, center_threshold=0.1):
+        self.center_threshold = center_threshold
+        self.reset()
+
+    def reset(self):
+        self.captured = set()
+        self._last_x = {}
+
+    def update(self, packet):
+        center_threshold = YOLO_INPUT_SIZE * self.center_threshold
+        target_x = YOLO_INPUT_SIZE // 2 - center_threshold
+
+        new_ids = set()
+        last_x = {}
+        for track in packet.get("tracks", []):
+            x0, _, x1, _ = track.box
+            x_center = (x0 + x1) / 2
+            last_x[track.track_id] = x_center
+            if track.track_id in self.captured:
+                continue
+            previous = self._last_x.get(track.track_id)
+            crossed = previous is not None and (previous - target_x) * (
+                x_center - target_x
+            ) < 0
+            if crossed or abs(x_center - target_x) < center_threshold:
+                new_ids.add(track.track_id)
+        self._last_x = last_x
+
+        if not new_ids:
+            return False
+        self.captured |= new_ids
+        packet["capture_detections"] = _tracked(packet["detections"], new_ids)
+        return True
+
+    def release(self, packet):
+        """Forget a capture that could not be queued so it is retried."""
+        if "capture_detections" in packet:
+            self.captured -= set(packet["capture_detections"].track_id.tolist())
+
+
+class FixedIntervalCapturePolicy(CapturePolicy):
+    """Capture at ``first_at`` seconds of video time and then every ``interval`` seconds."""
+
+    def __init__(self, first_at=0.0, interval=1.0):
+        self.first_at = first_at
+        self.interval = interval
+        self.reset()
+
+    def reset(self):
+        self.last_screenshot_time = None
+
+    def update(self, packet):
+        elapsed_time = packet["elapsed"]
+        if self.last_screenshot_time is None:
+            due = elapsed_time >= self.first_at
+        else:
+            due = elapsed_time - self.last_screenshot_time >= self.interval
+        if due:
+            self.last_screenshot_time = elapsed_time
+        return due
+
+
+class SegmentCapturePolicy(CapturePolicy):
+    """
+    Capture each strip segment once, based on the measured strip speed.
+
+    A StripSpeedEstimator accumulates how far the strip travelled since the
+    last capture. The next capture is taken once that equals the frame
+    extent along ``axis``, less ``overlap`` (a fraction of the frame). This
+    replaces the hand-tuned fixed intervals, and holds whatever the conveyor
+    speed or the frame rate the machine processes. Sets
+    ``packet["strip_speed"]`` (pixels/second, None until measured).
+    """
+
+    def __init__(self, first_at=0.0, overlap=0.0, axis="x", scale=0.25):
+        self.first_at = first_at
+        self.overlap = overlap
+        self.axis = axis
+        self.estimator = StripSpeedEstimator(scale=scale, axis=axis)
+        self.reset()
+
+    def reset(self):
+        self.estimator.reset()
+        self.travelled = None
+        self.missed_segments = 0
+
+    def update(self, packet):
+        frame = packet["frame"]
+        moved = self.estimator.update(frame, packet["elapsed"])
+        packet["strip_speed"] = self.estimator.speed
+        if packet["elapsed"] < self.first_at:
+            return False
+        if self.travelled is None:
+            # First capture as soon as the start delay has passed
+            self.travelled = 0.0
+            return True
+
+        extent = frame.shape[1] if self.axis == "x" else frame.shape[0]
+        segment = extent * (1.0 - self.overlap)
+        self.travelled += moved
+        if self.travelled < segment:
+            return False
+        # Keep the overshoot so captures do not drift along the strip
+        self.travelled -= segment
+        if self.travelled >= segment:
+            # Processing fell behind by more than a frame: a segment was missed
+            skipped = int(self.travelled // segment)
+            self.missed_segments += skipped
+            self.travelled -= skipped * segment
+        return True
+
+
+class TripLineCapturePolicy(CapturePolicy):
+    """
+    Capture every confirmed track once, when its center crosses a virtual line.
+
+    The line lies at ``position`` (fraction of the frame) along ``axis``, "x"
+    for a vertical line and "y" for a horizontal one. ``direction`` "forward"
+    only counts tracks moving towards larger coordinates, "backward" the
+    opposite and None both. Unlike TrackCapturePolicy there is no tolerance
+    band: a track has to be seen on both sides of the line, so tracks that
+    appear or stop on it are not captured. Only the crossing tracks' boxes
+    are written.
+    """
+
+    def __init__(self, position=0.4, axis="x", direction=None):
+        if direction not in (None, "forward", "backward"):
+            raise ValueError(f"Unknown trip-line direction: {direction}")
+        self.position = position
+        self.axis = axis
+        self.direction = direction
+        self.reset()
+
+    def reset(self):
+        self.captured = set()
+        self._last = {}
+
+    def _crossed(self, previous, current, line):
+        forward = previous < line <= current
+        backward = previous >= line > current
+        if self.direction == "forward":
+            return forward
+        if self.direction == "backward":
+            return backward
+        return forward or backward
+
+    def update(self, packet):
+        line = YOLO_INPUT_SIZE * self.position
+        first, second = (0, 2) if self.axis == "x" else (1, 3)
+
+        new_ids = set()
+        last = {}
+        for track in packet.get("tracks", []):
+            coordinate = (track.box[first] + track.box[second]) / 2
+            last[track.track_id] = coordinate
+            if track.track_id in self.captured:
+                continue
+            previous = self._last.get(track.track_id)
+            if previous is not None and self._crossed(previous, coordinate, line):
+                new_ids.add(track.track_id)
+        self._last = last
+
+        if not new_ids:
+            return False
+        self.captured |= new_ids
+        packet["capture_detections"] = _tracked(packet["detections"], new_ids)
+        return True
+
+    def release(self, packet):
+        """Forget a capture that could not be queued so it is retried."""
+        if "capture_detections" in packet:
+            self.captured -= set(packet["capture_detections"].track_id.tolist())
+
+
+class BestConfidenceCapturePolicy(CapturePolicy):
+    """
+    Capture the most confident frame of every window with detections.
+
+    A window opens with the first frame that has a detection of at least
+    ``min_confidence`` percent and closes ``window`` seconds of video time
+    later. The frame with the highest detection confidence in it is then
+    captured through ``capture_index``; the policy keeps that packet and
+    hands its native frame along as ``capture_frame``, so the capture does
+    not depend on the engine's frame buffer. One defect-model call per
+    window replaces one per frame.
+    """
+
+    def __init__(self, window=1.0, min_confidence=0.0):
+        self.window = window
+        self.min_confidence = min_confidence
+        self.reset()
+
+    def reset(self):
+        self._window_start = None
+        self._best = None  # (confidence, packet)
+
+    def update(self, packet):
+        captured = False
+        if (
+            self._window_start is not None
+            and packet["elapsed"] - self._window_start >= self.window
+        ):
+            _, best = self._best
+            packet["capture_index"] = best["index"]
+            packet["capture_frame"] = best["frame"]
+            packet["capture_detections"] = best["detections"]
+            self.reset()
+            captured = True
+
+        detections = packet["detections"]
+        confidence = detections.confidence.max() if len(detections) else None
+        if confidence is not None and confidence >= self.min_confidence:
+            if self._window_start is None:
+                self._window_start = packet["elapsed"]
+            if self._best is None or confidence > self._best[0]:
+                self._best = (confidence, packet)
+        return captured
+
+    def finish(self):
+        """The best frame of a window still open when the video ended."""
+        if self._best is None:
+            return None
+        _, best = self._best
+        self.reset()
+        # The packet may have triggered the previous window's capture
+        best = dict(best, capture_detections=best["detections"])
+        best.pop("capture_index", None)
+        best.pop("capture_frame", None)
+        return best
+
+
+CAPTURE_POLICIES = {
+    "center": CenterCapturePolicy,
+    "track": TrackCapturePolicy,
+    "trip-line": TripLineCapturePolicy,
+    "interval": FixedIntervalCapturePolicy,
+    "segment": SegmentCapturePolicy,
+    "best-confidence": BestConfidenceCapturePolicy,
+}
+
+
+def capture_policy_factory(name, **options):
+    """Factory for a DetectionProfile's ``capture_policy`` by policy name."""
+    try:
+        policy_class = CAPTURE_POLICIES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown capture policy: {name} (expected one of {sorted(CAPTURE_POLICIES)})"
+        ) from None
+    return partial(policy_class, **options)
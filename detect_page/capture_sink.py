@@ -0,0 +1,204 @@
+"""
+Default sink for captures: screenshot image, annotation CSV and database rows.
+
+``CaptureSink.write`` runs on the pipeline's persistence thread once the
+defect model has classified a capture. The screenshot is encoded and
+written by detect_page.image_writer in the background, and the CSV and
+database rows are buffered and written in batches (detect_page.persistence);
+``flush`` writes everything out. ``write_clip`` saves the frames around a
+capture as a short video; the engine reserves the capture's image name
+with ``reserve_image_name`` when it queues the capture, so the clip is
+named ``<image stem>_clip.mp4`` after its screenshot. Both anomaly and defect detections arrive in
+640x640 model space, as dict lists or DetectionBatch columns
+(detect_page.detections); both are written from the columns.
+"""
+
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+import ulid
+
+from detect_page.detections import DetectionBatch
+from detect_page.image_writer import ImageEncoding, WriteStats, shared_writer
+from detect_page.persistence import (
+    DETECTION_TABLES,
+    BatchedInserter,
+    BufferedCsvWriter,
+)
+from detect_page.pipeline import YOLO_INPUT_SIZE, draw_detections
+
+ANNOTATION_HEADER = [
+    "image_path",
+    "class_id",
+    "class",
+    "confidence",
+    "x_center",
+    "y_center",
+    "width",
+    "height",
+]
+
+
+def defect_detections(defect_results, names):
+    """Defect results as a DetectionBatch; class ids are shifted by 1."""
+    # Shift defect class_id by 1, names keep the model's own index
+    return DetectionBatch.from_results(defect_results, names, class_offset=1)
+
+
+class CaptureSink:
+    """
+    Writes one capture: the screenshot, its annotation rows and, when a
+    database engine is given, one row per detection in ``anomaly``/``defect``.
+    """
+
+    def __init__(
+        self,
+        annotation_csv_path,
+        db_engine=None,
+        draw_boxes=False,
+        screenshot_dir="screenshots",
+        encoding=None,
+        writer=None,
+    ):
+        self.annotation_csv_path = annotation_csv_path
+        self.db_engine = db_engine
+        self.draw_boxes = draw_boxes
+        self.screenshot_dir = screenshot_dir
+        self.encoding = encoding or ImageEncoding()
+        self.writer = writer or shared_writer()
+        self.image_stats = WriteStats()
+        # Paths handed to the writer or reserved; the files may not exist yet
+        self._image_paths = set()
+        self._reserved = set()
+        self._paths_lock = threading.Lock()
+        self.csv_writer = BufferedCsvWriter(annotation_csv_path, ANNOTATION_HEADER)
+        self.db_writer = BatchedInserter(db_engine) if db_engine is not None else None
+
+    def write(self, frame, detections, defects, image_name=None):
+        """Save the frame and the anomaly + defect annotations.
+
+        ``image_name`` defaults to the current timestamp; a numeric suffix is
+        added when several captures land in the same second. A name from
+        ``reserve_image_name`` is used as is.
+        """
+        image_path = self._unique_path(image_name, self.encoding.extension)
+
+        if self.draw_boxes:
+            frame = frame.copy()
+            draw_detections(
+                frame,
+                detections,
+                frame.shape[1] / YOLO_INPUT_SIZE,
+                frame.shape[0] / YOLO_INPUT_SIZE,
+            )
+        self.writer.submit(image_path, frame, self.encoding, self.image_stats)
+        print(f"[INFO] Screenshot queued as {image_path}")
+
+        # Anomaly detections (from the pipeline) + defect detections (from model)
+        all_detections = DetectionBatch.concat(
+            [DetectionBatch.coerce(detections), DetectionBatch.coerce(defects)]
+        )
+        self._write_csv(image_path, all_detections)
+        if self.db_writer is not None:
+            self._write_db(image_path, all_detections)
+
+    def reserve_image_name(self, image_name=None):
+        """Reserve the screenshot name of a capture written later; returns the stem."""
+        path = self._unique_path(image_name, self.encoding.extension)
+        with self._paths_lock:
+            self._reserved.add(path)
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def write_clip(self, frames, fps, image_name=None):
+        """
+        Save ``frames`` (BGR, equal sizes) as ``<image_name>_clip.mp4``, after
+        the capture's screenshot; returns its path.
+        """
+        clip_path = self._unique_path(image_name, "_clip.mp4")
+        height, width = frames[0].shape[:2]
+        writer = cv2.VideoWriter(
+            clip_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+        )
+        try:
+            for frame in frames:
+                writer.write(frame)
+        finally:
+            writer.release()
+        print(f"[INFO] Clip of {len(frames)} frames saved as {clip_path}")
+        return clip_path
+
+    def _unique_path(self, name, extension):
+        """Screenshot folder path for ``name`` (default: timestamp) not used yet."""
+        os.makedirs(self.screenshot_dir, exist_ok=True)
+        name = name or time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.screenshot_dir, f"{name}{extension}")
+        with self._paths_lock:
+            if path in self._reserved:
+                self._reserved.discard(path)
+                return path
+            suffix = 1
+            while path in self._image_paths or os.path.exists(path):
+                path = os.path.join(
+                    self.screenshot_dir, f"{name}_{suffix}{extension}"
+                )
+                suffix += 1
+            self._image_paths.add(path)
+        return path
+
+    def flush_if_due(self):
+        """Write the buffered rows that reached their size or age limit."""
+        self.csv_writer.flush_if_due()
+        if self.db_writer is not None:
+            self.db_writer.flush_if_due()
+
+    def flush(self, timeout=None):
+        """Write every buffered row and wait for the screenshots (end of run).
+
+        The CSV file is closed; it is reopened if more captures follow.
+        """
+        if self.db_writer is not None:
+            self.db_writer.flush()
+        self.csv_writer.close()
+        return self.image_stats.wait(timeout)
+
+    def _write_csv(self, image_path, all_detections):
+        self.csv_writer.write_rows(
+            [image_path, class_id, class_name, confidence, *xywh]
+            for class_id, class_name, confidence, xywh in zip(
+                all_detections.class_id.tolist(),
+                all_detections.labels.tolist(),
+                all_detections.confidence.tolist(),
+                all_detections.normalized_xywh().tolist(),
+            )
+        )
+
+    def _write_db(self, image_path, all_detections):
+        is_anomaly = np.array(
+            [label.lower() == "anomaly" for label in all_detections.labels.tolist()],
+            dtype=bool,
+        )
+        for name, mask in (("anomaly", is_anomaly), ("defect", ~is_anomaly)):
+            rows = all_detections.select(mask)
+            self.db_writer.add(
+                DETECTION_TABLES[name],
+                (
+                    {
+                        f"{name}_id": str(ulid.new()),
+                        "class_id": class_id,
+                        "image_path": image_path,
+                        "xcenter": x_center,
+                        "ycenter": y_center,
+                        "width": width,
+                        "height": height,
+                        "cl": cl,
+                    }
+                    for class_id, (x_center, y_center, width, height), cl in zip(
+                        rows.class_id.tolist(),
+                        rows.normalized_xywh().tolist(),
+                        (rows.confidence / 100.0).tolist(),
+                    )
+                ),
+            )
@@ -0,0 +1,82 @@
+"""
+Two-stage cascade: run the defect model on anomaly crops.
+
+Instead of squeezing the whole frame into 640x640, every anomaly box is
+expanded by a margin, cut out of the native-resolution frame and the crops
+are sent through the defect model together at a smaller input size. Small
+dents get more pixels and the defect stage only costs as much as there are
+anomalies. Defect boxes are mapped back to the frame and returned in the
+same 640x640 model space as the anomaly detections (as floats, see
+detect_page.tiling).
+"""
+
+import numpy as np
+
+from detect_page.detections import DetectionBatch
+from detect_page.pipeline import YOLO_INPUT_SIZE, nms_detections
+
+DEFECT_MODES = ("full", "cascade")
+
+
+def crop_regions(frame_shape, detections, margin=0.25, min_size=32):
+    """
+    Native-resolution crop boxes for the anomaly ``detections``.
+
+    Each box grows by ``margin`` of its width/height on every side, at least
+    to ``min_size`` pixels, and is clipped to the frame.
+    """
+    height, width = frame_shape[:2]
+    boxes = DetectionBatch.coerce(detections).boxes.astype(float) * (
+        width / YOLO_INPUT_SIZE,
+        height / YOLO_INPUT_SIZE,
+        width / YOLO_INPUT_SIZE,
+        height / YOLO_INPUT_SIZE,
+    )
+    sizes = boxes[:, 2:] - boxes[:, :2]
+    pad = np.maximum(np.maximum(sizes * margin, (min_size - sizes) / 2), 0)
+    regions = np.empty((len(boxes), 4), dtype=np.int64)
+    regions[:, :2] = np.maximum(0, (boxes[:, :2] - pad).astype(np.int64))
+    regions[:, 2:] = np.minimum(
+        (width, height), np.ceil(boxes[:, 2:] + pad).astype(np.int64)
+    )
+    valid = (regions[:, 2] > regions[:, 0]) & (regions[:, 3] > regions[:, 1])
+    return [tuple(region) for region in regions[valid].tolist()]
+
+
+def cascade_defects(
+    model,
+    frame,
+    detections,
+    imgsz=320,
+    margin=0.25,
+    batch_size=16,
+    iou_threshold=0.5,
+):
+    """
+    Run ``model`` on crops around ``detections`` of the native ``frame``.
+
+    Returns the defects as a DetectionBatch in 640x640 model space of the
+    full frame, with class ids shifted by 1 like
+    ``capture_sink.defect_detections``.
+    """
+    regions = crop_regions(frame.shape, detections, margin)
+    if not regions:
+        return DetectionBatch.empty()
+    crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in regions]
+
+    height, width = frame.shape[:2]
+    to_model_x = YOLO_INPUT_SIZE / width
+    to_model_y = YOLO_INPUT_SIZE / height
+    defects = []
+    for offset in range(0, len(crops), batch_size):
+        results = model.predict(
+            crops[offset : offset + batch_size], imgsz=imgsz, verbose=False
+        )
+        for (rx0, ry0, _, _), result in zip(regions[offset:], results):
+            # Boxes come back in crop pixels; shift defect class_id by 1
+            defects.append(
+                DetectionBatch.from_result(
+                    result, model.names, class_offset=1, truncate=False
+                ).translated(rx0, ry0, to_model_x, to_model_y)
+            )
+    return nms_detections(DetectionBatch.concat(defects), iou_threshold)
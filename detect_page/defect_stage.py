@@ -0,0 +1,96 @@
+"""
+Background defect-model stage for the detection pipeline.
+
+Captured frames and their anomaly detections are handed to a small worker
+pool through a bounded queue, so defect classification never stalls the
+anomaly stream. When the queue is full a new capture is dropped and counted
+instead of blocking the caller, unless it is submitted with ``block=True``
+(headless runs, where every capture matters more than the frame rate).
+"""
+
+import queue
+import threading
+
+_STOP = object()
+
+
+class DefectStage:
+    """
+    Worker pool running ``handler(*args, **kwargs)`` for every accepted capture.
+
+    ``on_result(result)`` is called from the worker thread whenever the handler
+    returns a value other than None. YOLO instances are not thread-safe, so
+    the handler must guard its model itself when ``workers > 1``.
+    """
+
+    def __init__(self, handler, workers=1, queue_size=8, on_result=None):
+        self.handler = handler
+        self.on_result = on_result
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(
+                target=self._worker_loop, name=f"defect-worker-{i}", daemon=True
+            )
+            for i in range(max(1, workers))
+        ]
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self):
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, *args, block=False, **kwargs):
+        """
+        Queue one capture. Returns False if it was dropped because the queue is
+        full; with ``block=True`` it waits for a free slot instead.
+        """
+        try:
+            self._jobs.put((args, kwargs), block=block)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def stats(self):
+        """Snapshot of queue depth and job counters."""
+        with self._lock:
+            return {
+                "queued": self._jobs.qsize(),
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+    def stop(self):
+        """Finish every queued capture, then stop the workers."""
+        alive = [worker for worker in self._workers if worker.is_alive()]
+        for _ in alive:
+            self._jobs.put(_STOP)
+        for worker in alive:
+            worker.join()
+
+    def _worker_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                break
+            args, kwargs = job
+            try:
+                result = self.handler(*args, **kwargs)
+            except Exception as e:
+                print(f"Error saat menjalankan defect model: {e}")
+                with self._lock:
+                    self.failed += 1
+                continue
+            with self._lock:
+                self.processed += 1
+            if result is not None and self.on_result:
+                self.on_result(result)
@@ -0,0 +1,274 @@
+"""
+Per-run binary log of every frame's detections.
+
+A run used to leave only the capture CSV and the FPS history, so every new
+question about a video meant running the models over it again. The engine
+now also appends each processed frame's anomaly detections to a
+``.dlog`` file next to the FPS history:
+
+- the file starts with ``MAGIC``, followed by records of an 8-byte
+  little-endian length and one ``.npy`` array (numpy.lib.format)
+- the first record is the run's metadata as UTF-8 JSON bytes
+- then pairs of chunks: FRAME_DTYPE rows (one per frame) and DETECTION_DTYPE
+  rows (one per detection, in 640x640 model space); a frame's detections
+  are rows ``first`` to ``first + count`` of the whole log
+
+Rows are collected in memory and written ``chunk_frames`` frames at a time,
+so the per-frame cost is one small array filled from the batch columns.
+DetectionLog maps the chunks back with numpy.memmap; a record cut off by a
+crash is ignored.
+
+    python -m detect_page.detection_log history/coil_01_20250101-120000.dlog
+"""
+
+import argparse
+import io
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"SDDLOG1\n"
+_LENGTH = struct.Struct("<Q")
+
+FRAME_DTYPE = np.dtype(
+    [
+        ("frame", "<i8"),
+        ("elapsed", "<f8"),
+        ("time", "<f8"),
+        ("first", "<i8"),
+        ("count", "<i4"),
+        ("gated", "?"),
+    ]
+)
+DETECTION_DTYPE = np.dtype(
+    [
+        ("frame", "<i8"),
+        ("x0", "<f4"),
+        ("y0", "<f4"),
+        ("x1", "<f4"),
+        ("y1", "<f4"),
+        ("confidence", "<f4"),
+        ("class_id", "<i4"),
+        ("track_id", "<i4"),
+    ]
+)
+
+
+class DetectionLogWriter:
+    """
+    Appends frames to a detection log.
+
+    ``append`` is cheap and returns a full chunk every ``chunk_frames``
+    frames; pass it to ``write_chunk``, possibly on another thread (the
+    engine uses the persistence thread). ``close`` writes the rest.
+    """
+
+    def __init__(self, path, metadata=None, chunk_frames=256):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._write_record(
+            np.frombuffer(json.dumps(metadata or {}).encode("utf-8"), np.uint8)
+        )
+        self._frames = []
+        self._detections = []
+        self._next_row = 0
+        self.frames_written = 0
+        self.detections_written = 0
+
+    def append(self, index, elapsed, timestamp, detections, gated=False):
+        """Log one frame's DetectionBatch; returns a chunk to write, or None."""
+        count = len(detections)
+        self._frames.append((index, elapsed, timestamp, self._next_row, count, gated))
+        if count:
+            rows = np.empty(count, DETECTION_DTYPE)
+            rows["frame"] = index
+            for name, column in zip(("x0", "y0", "x1", "y1"), detections.boxes.T):
+                rows[name] = column
+            rows["confidence"] = detections.confidence
+            rows["class_id"] = detections.class_id
+            rows["track_id"] = detections.track_id
+            self._detections.append(rows)
+        self._next_row += count
+        if len(self._frames) >= self.chunk_frames:
+            return self.take_chunk()
+        return None
+
+    def take_chunk(self):
+        """The frames appended since the last chunk as arrays, or None."""
+        if not self._frames:
+            return None
+        chunk = (
+            np.array(self._frames, dtype=FRAME_DTYPE),
+            _concat(self._detections, DETECTION_DTYPE),
+        )
+        self._frames = []
+        self._detections = []
+        return chunk
+
+    def write_chunk(self, chunk):
+        frames, detections = chunk
+        self._write_record(frames)
+        self._write_record(detections)
+        self.frames_written += len(frames)
+        self.detections_written += len(detections)
+
+    def close(self):
+        """Write the remaining frames, sync and close the file."""
+        if self._file is None:
+            return
+        chunk = self.take_chunk()
+        if chunk is not None:
+            self.write_chunk(chunk)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def _write_record(self, array):
+        buffer = io.BytesIO()
+        np.lib.format.write_array(buffer, array, allow_pickle=False)
+        data = buffer.getbuffer()
+        self._file.write(_LENGTH.pack(len(data)))
+        self._file.write(data)
+
+
+def _map_array(path, file, offset, length):
+    """Memory-map the .npy record of ``length`` bytes at ``offset``."""
+    file.seek(offset)
+    version = np.lib.format.read_magic(file)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+    data_offset = file.tell()
+    if data_offset + int(np.prod(shape)) * dtype.itemsize > offset + length:
+        raise ValueError("Truncated record")
+    if not np.prod(shape):
+        return np.empty(shape, dtype)
+    return np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        offset=data_offset,
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+
+class DetectionLog:
+    """
+    Read-only view of a detection log.
+
+    ``chunks`` holds ``(frames, detections)`` memmaps per chunk; ``frames``
+    and ``detections`` concatenate them on first use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.metadata = {}
+        self.chunks = []
+        self._frames = None
+        self._detections = None
+        size = os.path.getsize(path)
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a detection log: {path}")
+            records = []
+            offset = len(MAGIC)
+            while offset + _LENGTH.size <= size:
+                file.seek(offset)
+                (length,) = _LENGTH.unpack(file.read(_LENGTH.size))
+                start = offset + _LENGTH.size
+                if start + length > size:
+                    break  # Cut off while it was written
+                try:
+                    records.append(_map_array(path, file, start, length))
+                except ValueError:
+                    break
+                offset = start + length
+        if records:
+            self.metadata = json.loads(bytes(records[0]).decode("utf-8"))
+        # Only complete frame/detection pairs
+        pairs = records[1:]
+        self.chunks = list(zip(pairs[0::2], pairs[1::2]))
+
+    @property
+    def frames(self):
+        if self._frames is None:
+            self._frames = _concat([frames for frames, _ in self.chunks], FRAME_DTYPE)
+        return self._frames
+
+    @property
+    def detections(self):
+        if self._detections is None:
+            self._detections = _concat(
+                [detections for _, detections in self.chunks], DETECTION_DTYPE
+            )
+        return self._detections
+
+    def __len__(self):
+        return sum(len(frames) for frames, _ in self.chunks)
+
+    def frame_detections(self, frame_index):
+        """DETECTION_DTYPE rows of frame ``frame_index`` (empty if not logged)."""
+        frames = self.frames
+        position = np.searchsorted(frames["frame"], frame_index)
+        if position == len(frames) or frames["frame"][position] != frame_index:
+            return self.detections[:0]
+        first = frames["first"][position]
+        return self.detections[first : first + frames["count"][position]]
+
+    def class_names(self):
+        """Class id -> name from the metadata."""
+        return {int(k): v for k, v in self.metadata.get("class_names", {}).items()}
+
+
+def _concat(arrays, dtype):
+    if not arrays:
+        return np.empty(0, dtype)
+    if len(arrays) == 1:
+        return arrays[0]
+    return np.concatenate(arrays)
+
+
+def summarize(log):
+    """Text summary of a DetectionLog."""
+    frames = log.frames
+    detections = log.detections
+    names = log.class_names()
+    lines = [
+        f"{log.path}: {len(frames)} frames, {len(detections)} detections",
+    ]
+    if len(frames):
+        lines.append(
+            f"  frames {frames['frame'][0]}..{frames['frame'][-1]}, "
+            f"{frames['elapsed'][-1]:.1f} s of video, "
+            f"{int(frames['gated'].sum())} gated, "
+            f"{int((frames['count'] > 0).sum())} with detections"
+        )
+    class_ids, counts = np.unique(detections["class_id"], return_counts=True)
+    for class_id, count in zip(class_ids.tolist(), counts.tolist()):
+        confidence = detections["confidence"][detections["class_id"] == class_id]
+        lines.append(
+            f"  {names.get(class_id, class_id)}: {count} detections, "
+            f"confidence avg {confidence.mean():.1f}% max {confidence.max():.1f}%"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize detection logs.")
+    parser.add_argument("logs", nargs="+", help=".dlog files from the history folder")
+    args = parser.parse_args(argv)
+    for path in args.logs:
+        print(summarize(DetectionLog(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
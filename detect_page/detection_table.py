@@ -0,0 +1,187 @@
+"""
+Model/view detection table for the detection pages.
+
+Rebuilding a QTableWidget per frame (clearContents, eight new items per
+detection, resizeRowsToContents) is a visible share of the GUI thread.
+DetectionTableModel keeps one row per detection, keyed by its track uid
+(or by class and box for unconfirmed detections), and applies each update
+as a diff: rows that disappeared are removed, new rows inserted and only
+rows whose text changed are repainted. ``queue_detections`` coalesces
+updates so the table refreshes at most ``refresh_hz`` times per second; the
+first update after a quiet period is shown right away.
+"""
+
+import ulid
+from PySide6.QtCore import (
+    QAbstractTableModel,
+    QCoreApplication,
+    QModelIndex,
+    Qt,
+    QTimer,
+)
+
+from detect_page.detections import DetectionBatch
+
+DETECTION_COLUMNS = [
+    "No.",
+    "Box Id",
+    "Class",
+    "Confidence",
+    "x-center",
+    "y-center",
+    "width",
+    "height",
+]
+
+
+def _row_key(track_uid, label, box):
+    if track_uid:
+        return track_uid
+    return ("box", label, *box)
+
+
+class DetectionTableModel(QAbstractTableModel):
+    """Detections sorted by x-center, one row per tracked (or unconfirmed) box."""
+
+    def __init__(self, parent=None, refresh_hz=5.0):
+        super().__init__(parent)
+        self._keys = []
+        self._rows = []  # Display texts of columns 1.. per row
+        self._box_ids = {}  # Row key -> shown id of unconfirmed boxes
+        self._pending = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._on_timer)
+        self.set_refresh_rate(refresh_hz)
+
+    def set_refresh_rate(self, refresh_hz):
+        """Limit table refreshes to ``refresh_hz`` per second (0: every update)."""
+        self.refresh_hz = refresh_hz
+        self._timer.setInterval(int(1000 / refresh_hz) if refresh_hz > 0 else 0)
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(DETECTION_COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        if index.column() == 0:
+            return str(index.row() + 1)
+        return self._rows[index.row()][index.column() - 1]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return QCoreApplication.translate(
+                "detectWidget", DETECTION_COLUMNS[section], None
+            )
+        return str(section + 1)
+
+    # --- Updates ---
+
+    def queue_detections(self, detections):
+        """Queue ``detections`` for display, applying at most ``refresh_hz`` times/s."""
+        if self.refresh_hz <= 0:
+            self.set_detections(detections)
+            return
+        self._pending = detections
+        if not self._timer.isActive():
+            self._flush()
+            self._timer.start()
+
+    def flush(self):
+        """Apply a queued update now (e.g. when the video stops)."""
+        self._flush()
+        self._timer.stop()
+
+    def clear(self):
+        self._pending = None
+        self._timer.stop()
+        self.set_detections(DetectionBatch.empty())
+
+    def _on_timer(self):
+        if self._pending is None:
+            # Nothing new since the last refresh
+            self._timer.stop()
+        else:
+            self._flush()
+
+    def _flush(self):
+        if self._pending is not None:
+            detections, self._pending = self._pending, None
+            self.set_detections(detections)
+
+    def set_detections(self, detections):
+        """Show ``detections`` (DetectionBatch in 640x640 model space) right away."""
+        batch = DetectionBatch.coerce(detections)
+        xywh = batch.normalized_xywh().tolist()
+        confidence = batch.confidence.tolist()
+        labels = batch.labels.tolist()
+        boxes = batch.boxes.tolist()
+        track_uids = batch.track_uid.tolist()
+
+        keys = []
+        rows = []
+        box_ids = {}
+        for index in batch.order("x_center").tolist():
+            track_uid = track_uids[index]
+            key = _row_key(track_uid, labels[index], boxes[index])
+            if key in box_ids:
+                # Two identical unconfirmed boxes
+                key = (*key, index)
+            box_id = track_uid or self._box_ids.get(key) or str(ulid.new())
+            box_ids[key] = box_id
+            x_center, y_center, width, height = xywh[index]
+            keys.append(key)
+            rows.append(
+                (
+                    box_id,
+                    labels[index],
+                    f"{confidence[index]:.2f}%",
+                    f"{x_center:.5f}",
+                    f"{y_center:.5f}",
+                    f"{width:.5f}",
+                    f"{height:.5f}",
+                )
+            )
+        self._box_ids = box_ids
+        self._apply(keys, rows)
+
+    def _apply(self, keys, rows):
+        if keys != self._keys:
+            wanted = set(keys)
+            for row in reversed(range(len(self._keys))):
+                if self._keys[row] not in wanted:
+                    self.beginRemoveRows(QModelIndex(), row, row)
+                    del self._keys[row]
+                    del self._rows[row]
+                    self.endRemoveRows()
+
+            kept = set(self._keys)
+            if self._keys != [key for key in keys if key in kept]:
+                # Rows changed order (boxes passed each other): redraw all
+                self.beginResetModel()
+                self._keys = list(keys)
+                self._rows = list(rows)
+                self.endResetModel()
+                return
+
+            for row, key in enumerate(keys):
+                if row >= len(self._keys) or self._keys[row] != key:
+                    self.beginInsertRows(QModelIndex(), row, row)
+                    self._keys.insert(row, key)
+                    self._rows.insert(row, rows[row])
+                    self.endInsertRows()
+
+        last_column = len(DETECTION_COLUMNS) - 1
+        for row, values in enumerate(rows):
+            if self._rows[row] != values:
+                self._rows[row] = values
+                self.dataChanged.emit(
+                    self.index(row, 1), self.index(row, last_column), [Qt.DisplayRole]
+                )
@@ -0,0 +1,340 @@
+"""
+Shared Qt front-end for the video detection pages.
+
+DetectionWidgetBase owns the window layout, the detection table and the
+frame display. All processing happens in a DetectionEngine; subclasses only
+pick the profile, the generated UI class and how a video is chosen. The
+profile's models are warmed up in the background when the page is built
+(see detect_page.resources).
+"""
+
+import os
+import time
+
+from PySide6.QtCore import QObject, Qt, Signal
+from PySide6.QtWidgets import (
+    QComboBox,
+    QFileDialog,
+    QFrame,
+    QGridLayout,
+    QLayout,
+    QMainWindow,
+    QMessageBox,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from detect_page import resources
+from detect_page.detections import DetectionBatch
+from detect_page.engine import DetectionEngine
+
+
+class PipelineSignals(QObject):
+    """Bridges engine callbacks from worker threads onto the GUI thread."""
+
+    frame_ready = Signal(object)
+    finished = Signal()
+    failed = Signal(object)
+    capture_done = Signal(object)
+    models_ready = Signal(object)
+
+
+class DetectionWidgetBase(QMainWindow):
+    """
+    Base widget for video detection using a DetectionEngine.
+
+    Subclasses set ``ui_class`` and ``profile`` and connect their own
+    buttons to ``start_video``, ``pause_video`` and ``stop_video``.
+    """
+
+    ui_class = None
+    profile = None
+    # Detection table refreshes per second (0 refreshes on every frame)
+    table_refresh_hz = 5.0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        # Create central widget
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        # Create main grid layout
+        main_layout = QGridLayout(central_widget)
+
+        # Create left sidebar
+        sidebar_layout = QVBoxLayout()
+        sidebar_layout.setSizeConstraint(QLayout.SetFixedSize)
+
+        # Add combo box to sidebar
+        self.combo_box = QComboBox()
+        self.combo_box.addItems(["Main", "Detect", "Label", "Train", "Report", "Admin"])
+        self.combo_box.setCurrentText("Detect")
+        sidebar_layout.addWidget(self.combo_box, 0, Qt.AlignLeft | Qt.AlignTop)
+
+        # Add logout button to sidebar
+        self.logout_button = QPushButton("LOGOUT")
+        sidebar_layout.addWidget(self.logout_button, 0, Qt.AlignLeft | Qt.AlignBottom)
+
+        # Add sidebar to main layout
+        main_layout.addLayout(sidebar_layout, 0, 0, 1, 1)
+
+        # Add vertical line separator
+        line = QFrame()
+        line.setFrameShape(QFrame.VLine)
+        line.setFrameShadow(QFrame.Sunken)
+        main_layout.addWidget(line, 0, 1, 1, 1)
+
+        # Create widget for detection content
+        detection_widget = QWidget()
+        self.ui = self.ui_class()
+        self.ui.setupUi(detection_widget)
+
+        # Add detection widget to main layout
+        main_layout.addWidget(detection_widget, 0, 2, 1, 1)
+        self.ui.table_model.set_refresh_rate(self.table_refresh_hz)
+
+        # Initialize other attributes
+        self.is_playing = False
+        self.last_frame_display = None
+        self.last_detections = DetectionBatch.empty()
+        self.confidence_threshold = 0.0
+
+        # Worker threads report back through queued signals
+        self.pipeline_signals = PipelineSignals(self)
+        self.pipeline_signals.frame_ready.connect(self.on_frame_ready)
+        self.pipeline_signals.finished.connect(self.on_video_finished)
+        self.pipeline_signals.failed.connect(self.on_video_failed)
+        self.pipeline_signals.capture_done.connect(self.on_capture_done)
+        self.pipeline_signals.models_ready.connect(self._on_models_ready)
+
+        # Created with the first video, once the models are loaded
+        self.engine = None
+        self._pending_video = None
+        resources.models_future(self.profile)
+
+        self.ui.pause_button.clicked.connect(self.pause_video)
+        self.ui.stop_button.clicked.connect(self.stop_video)
+        # Stopping writes the queued captures before the session ends
+        self.logout_button.clicked.connect(self.stop_video)
+
+    @property
+    def is_running(self):
+        return self.engine is not None and self.engine.is_running
+
+    def start_video(self, file_path):
+        """Start processing a video file (after the models finished loading)."""
+        if self.is_running:
+            self.stop_video()
+        future = resources.models_future(self.profile)
+        if not future.done():
+            self.ui.detection_image_label.setText("Loading models...")
+            self._pending_video = file_path
+            future.add_done_callback(self.pipeline_signals.models_ready.emit)
+            return
+        self._start_engine(file_path, future)
+
+    def _on_models_ready(self, future):
+        file_path, self._pending_video = self._pending_video, None
+        if file_path:
+            self._start_engine(file_path, future)
+
+    def _start_engine(self, file_path, future):
+        """Start the engine with the models of a finished ``future`` (GUI thread)."""
+        try:
+            # Raises the load error without waiting or loading again
+            anomaly_model, defect_model = future.result(timeout=0)
+            db_engine = (
+                resources.get_db_engine() if self.profile.use_database else None
+            )
+        except Exception as e:
+            print(f"Error saat memuat model atau database: {e}")
+            self.ui.detection_image_label.setText(f"Error: {e}")
+            return
+
+        if self.engine is None:
+            self.engine = DetectionEngine(
+                self.profile,
+                anomaly_model,
+                defect_model,
+                on_frame=self.pipeline_signals.frame_ready.emit,
+                on_finished=self.pipeline_signals.finished.emit,
+                on_capture_done=self.pipeline_signals.capture_done.emit,
+                on_error=self.pipeline_signals.failed.emit,
+                db_engine=db_engine,
+            )
+        self.is_playing = True
+        self.ui.detection_image_label.setText("Processing video...")
+        self.last_frame_display = None
+        self.last_detections = DetectionBatch.empty()
+        self.engine.start(
+            file_path,
+            conf_threshold=self.confidence_threshold,
+            display_size=self._display_size(),
+            overlay=True,
+        )
+
+    def _display_size(self):
+        return (
+            max(1, self.ui.detection_image_label.width()),
+            max(1, self.ui.detection_image_label.height()),
+        )
+
+    def show_frame(self, frame_display, detections=()):
+        """Show a BGR display frame with the detection overlay (no copies)."""
+        self.ui.detection_image_label.set_frame(frame_display, detections)
+
+    def on_video_finished(self):
+        """Handle the end of the video once all frames have been shown."""
+        if not self.is_running:
+            return
+        elapsed_time = time.time() - self.engine.start_time
+        self.update_defect_queue_label()
+        self.engine.stop()
+        self.is_playing = False
+
+        minutes = int(elapsed_time // 60)
+        seconds = int(elapsed_time % 60)
+        self.ui.duration_label.setText(f"Video Duration: {minutes:02d}:{seconds:02d}")
+
+        if self.last_frame_display is not None:
+            self.show_frame(self.last_frame_display, self.last_detections)
+            self.update_detection_table(self.last_detections)
+            self.ui.table_model.flush()
+
+    def on_video_failed(self, error):
+        """Stop a run whose inference failed and show the error."""
+        if not self.is_running:
+            return
+        self.stop_video()
+        self.ui.duration_label.setText("Video Stopped (error)")
+        self.ui.detection_image_label.setText(f"Error: {error}")
+        QMessageBox.warning(self, "Detection stopped", f"Detection stopped: {error}")
+
+    def on_frame_ready(self, packet):
+        """Show a processed frame (GUI thread)."""
+        if not self.is_running:
+            return
+        self.engine.set_display_size(self._display_size())
+
+        total_time = packet["total_time"]
+        if total_time is not None:
+            self.ui.processing_time_label.setText(
+                f"Processing Time: {total_time:.1f} ms"
+            )
+            self.ui.fps_label.setText(f"FPS: {packet['fps']:.2f}")
+        else:
+            self.ui.processing_time_label.setText("Processing Time: N/A")
+            self.ui.fps_label.setText("FPS: N/A")
+
+        # The pipeline hands over fresh arrays per frame, no copy needed
+        self.last_frame_display = packet["display_frame"]
+        self.last_detections = packet["detections"]
+
+        self.update_detection_table(packet["detections"])
+        self.update_defect_queue_label()
+
+        # Display frame
+        self.show_frame(packet["display_frame"], packet["detections"])
+
+        elapsed_time = packet["elapsed"]
+        minutes = int(elapsed_time // 60)
+        seconds = int(elapsed_time % 60)
+        self.ui.duration_label.setText(f"Video Duration: {minutes:02d}:{seconds:02d}")
+
+    def on_capture_done(self, combined_total_time):
+        """Show the combined anomaly + defect timing of a finished capture."""
+        combined_fps = 1000.0 / combined_total_time if combined_total_time > 0 else 0
+        self.ui.fps_label.setText(f"Combined FPS: {combined_fps:.2f}")
+        self.ui.processing_time_label.setText(
+            f"Combined Time: {combined_total_time:.1f} ms"
+        )
+
+    def update_defect_queue_label(self):
+        """Show how far the background defect stage is behind."""
+        if self.engine is None:
+            return
+        stats = self.engine.defect_stats()
+        if stats is None:
+            return
+        self.ui.defect_queue_label.setText(
+            f"Defect Queue: {stats['queued']} | "
+            f"Processed: {stats['processed']} | Dropped: {stats['dropped']}"
+        )
+
+    def update_detection_table(self, detections):
+        """Queue detections for the table; it refreshes at ``table_refresh_hz``."""
+        self.ui.table_model.queue_detections(detections)
+
+    def stop_video(self):
+        """Stop the video playback and reset the UI."""
+        self.is_playing = False
+        self._pending_video = None
+        self.update_defect_queue_label()
+        if self.engine is not None:
+            self.engine.stop()
+
+        if self.last_frame_display is not None:
+            self.show_frame(self.last_frame_display, self.last_detections)
+            self.update_detection_table(self.last_detections)
+            self.ui.table_model.flush()
+
+        self.ui.duration_label.setText("Video Stopped")
+        self.ui.pause_button.setText("Pause")
+
+    def pause_video(self):
+        """Pause or resume the video playback."""
+        if not self.is_running:
+            return
+        if self.is_playing:
+            self.is_playing = False
+            self.engine.pause()
+            self.ui.pause_button.setText("Resume")
+        else:
+            self.is_playing = True
+            self.engine.resume()
+            self.ui.pause_button.setText("Pause")
+
+
+class SelectThenStartWidget(DetectionWidgetBase):
+    """
+    Variant for UIs with separate "Select Video" and "Start" buttons
+    (see ui_detect_box.py).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+
+        # Connect new buttons
+        self.ui.select_video_button.clicked.connect(self.select_video)
+        self.ui.start_detection_button.clicked.connect(self.start_detection)
+
+        # Disable start_detection_button initially
+        self.ui.start_detection_button.setEnabled(False)
+        self.selected_video_path = None
+
+    def select_video(self):
+        """Open a file dialog to select a video file."""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select Video File",
+            "",
+            "Video Files (*.mp4 *.avi *.mov *.mkv *.wmv)",
+        )
+        if file_path:
+            self.selected_video_path = file_path
+            self.ui.start_detection_button.setEnabled(True)
+            self.ui.detection_image_label.setText(
+                f"Selected: {os.path.basename(file_path)}"
+            )
+        else:
+            self.selected_video_path = None
+            self.ui.start_detection_button.setEnabled(False)
+            self.ui.detection_image_label.setText("No video loaded")
+
+    def start_detection(self):
+        """Start processing the selected video."""
+        if not self.selected_video_path:
+            return
+        self.start_video(self.selected_video_path)
@@ -0,0 +1,244 @@
+"""
+Columnar detection records.
+
+A DetectionBatch holds the boxes of one image as NumPy columns in 640x640
+model space, filled straight from the result tensors instead of one
+``box.xyxy[0].tolist()`` call per box. Packets carry their detections as
+a DetectionBatch from the model to the tracker, the capture policies, the
+table, the overlay and the CSV, database and log writers; filtering,
+sorting, NMS, scaling and YOLO normalization run vectorized on it.
+
+The tracker fills the ``track_id``/``track_uid`` columns in place.
+``to_dicts``/``from_dicts`` convert to and from the older detection dicts.
+"""
+
+import numpy as np
+
+YOLO_INPUT_SIZE = 640
+
+
+def _to_numpy(values):
+    """Tensor (any device) or array to a NumPy array."""
+    if hasattr(values, "cpu"):
+        values = values.cpu()
+    if hasattr(values, "numpy"):
+        return values.numpy()
+    return np.asarray(values)
+
+
+def _name_table(names):
+    """Class names (list or {id: name} dict) as an object array indexed by id."""
+    if isinstance(names, dict):
+        table = np.empty(max(names, default=-1) + 1, dtype=object)
+        for class_id, name in names.items():
+            table[class_id] = name
+        return table
+    return np.asarray(list(names), dtype=object)
+
+
+class DetectionBatch:
+    """
+    Detections of one image as columns.
+
+    - ``boxes``: (n, 4) x0, y0, x1, y1 in 640x640 model space; int32 for
+      resized-frame results, float64 for tiled and cascade results
+    - ``confidence``: (n,) in percent
+    - ``class_id``: (n,) int32
+    - ``labels``: (n,) class names (object array)
+    - ``track_id``: (n,) int32, -1 until the tracker confirmed the box
+    - ``track_uid``: (n,) track ULIDs (object array), None when unconfirmed
+    """
+
+    __slots__ = ("boxes", "confidence", "class_id", "labels", "track_id", "track_uid")
+
+    def __init__(
+        self, boxes, confidence, class_id, labels, track_id=None, track_uid=None
+    ):
+        self.boxes = boxes
+        self.confidence = confidence
+        self.class_id = class_id
+        self.labels = labels
+        count = len(confidence)
+        self.track_id = (
+            np.full(count, -1, np.int32) if track_id is None else track_id
+        )
+        self.track_uid = (
+            np.full(count, None, object) if track_uid is None else track_uid
+        )
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.empty((0, 4), np.int32),
+            np.empty(0, np.float64),
+            np.empty(0, np.int32),
+            np.empty(0, object),
+        )
+
+    @classmethod
+    def from_result(
+        cls, result, names, conf_threshold=0.0, class_offset=0, truncate=True
+    ):
+        """
+        Columns of one YOLO result, boxes truncated to whole pixels.
+
+        ``conf_threshold`` is a fraction like the model's confidences;
+        ``class_offset`` is added to the class ids (1 for the defect model),
+        while the names are still looked up by the model's own id. With
+        ``truncate=False`` the boxes stay float64 (tile and crop results
+        that are mapped back with ``translated``).
+        """
+        if result is None or not hasattr(result, "boxes"):
+            return cls.empty()
+        boxes = result.boxes
+        conf = _to_numpy(boxes.conf).reshape(-1).astype(np.float64)
+        keep = conf >= conf_threshold
+        xyxy = _to_numpy(boxes.xyxy).reshape(-1, 4)[keep]
+        model_ids = _to_numpy(boxes.cls).reshape(-1)[keep].astype(np.int32)
+        return cls(
+            xyxy.astype(np.int32 if truncate else np.float64),
+            conf[keep] * 100,
+            model_ids + class_offset,
+            _name_table(names)[model_ids],
+        )
+
+    @classmethod
+    def from_results(cls, results, names, conf_threshold=0.0, class_offset=0):
+        return cls.concat(
+            [
+                cls.from_result(result, names, conf_threshold, class_offset)
+                for result in results
+            ]
+        )
+
+    @classmethod
+    def from_dicts(cls, detections):
+        if not detections:
+            return cls.empty()
+        boxes = np.array(
+            [(det["x0"], det["y0"], det["x1"], det["y1"]) for det in detections]
+        )
+        boxes = (
+            boxes.astype(np.int32)
+            if np.issubdtype(boxes.dtype, np.integer)
+            else boxes.astype(np.float64)
+        )
+        track_id = [det.get("track_id") for det in detections]
+        return cls(
+            boxes,
+            np.array([det["confidence"] for det in detections], np.float64),
+            np.array([det["class_id"] for det in detections], np.int32),
+            np.array([det["class"] for det in detections], object),
+            np.array([-1 if t is None else t for t in track_id], np.int32),
+            np.array([det.get("track_uid") for det in detections], object),
+        )
+
+    @classmethod
+    def coerce(cls, detections):
+        """Return ``detections`` as a DetectionBatch (dict lists are converted)."""
+        if isinstance(detections, cls):
+            return detections
+        return cls.from_dicts(list(detections))
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            np.concatenate([batch.boxes for batch in batches]),
+            np.concatenate([batch.confidence for batch in batches]),
+            np.concatenate([batch.class_id for batch in batches]),
+            np.concatenate([batch.labels for batch in batches]),
+            np.concatenate([batch.track_id for batch in batches]),
+            np.concatenate([batch.track_uid for batch in batches]),
+        )
+
+    def __len__(self):
+        return len(self.confidence)
+
+    def select(self, index):
+        """Rows by boolean mask or index array, in that order."""
+        return DetectionBatch(
+            self.boxes[index],
+            self.confidence[index],
+            self.class_id[index],
+            self.labels[index],
+            self.track_id[index],
+            self.track_uid[index],
+        )
+
+    def copy(self):
+        """Same boxes with their own (reset) track columns, e.g. for gated frames."""
+        return DetectionBatch(self.boxes, self.confidence, self.class_id, self.labels)
+
+    def translated(self, offset_x, offset_y, scale_x, scale_y):
+        """Boxes shifted by an offset in pixels, then scaled; rounded to 0.01."""
+        boxes = (self.boxes + (offset_x, offset_y, offset_x, offset_y)) * (
+            scale_x,
+            scale_y,
+            scale_x,
+            scale_y,
+        )
+        return DetectionBatch(
+            np.round(boxes, 2),
+            self.confidence,
+            self.class_id,
+            self.labels,
+            self.track_id,
+            self.track_uid,
+        )
+
+    def x_center(self):
+        return (self.boxes[:, 0] + self.boxes[:, 2]) / 2
+
+    def above(self, conf_threshold):
+        """Rows with a confidence (percent) of at least ``conf_threshold``."""
+        return self.select(self.confidence >= conf_threshold)
+
+    def order(self, key="x_center"):
+        """Row order by ``x_center`` (left to right) or ``confidence`` (highest first)."""
+        if key == "confidence":
+            return np.argsort(-self.confidence, kind="stable")
+        if key == "x_center":
+            return np.argsort(self.x_center(), kind="stable")
+        raise ValueError(f"Unknown sort key: {key}")
+
+    def scaled(self, scale_x, scale_y):
+        """Boxes scaled from model space to pixels, truncated to int."""
+        return (self.boxes * (scale_x, scale_y, scale_x, scale_y)).astype(np.int32)
+
+    def normalized_xywh(self):
+        """(n, 4) x_center, y_center, width, height, normalized to 0..1."""
+        boxes = self.boxes.astype(np.float64)
+        xywh = np.empty_like(boxes)
+        xywh[:, 0] = (boxes[:, 0] + boxes[:, 2]) / 2 / YOLO_INPUT_SIZE
+        xywh[:, 1] = (boxes[:, 1] + boxes[:, 3]) / 2 / YOLO_INPUT_SIZE
+        xywh[:, 2] = (boxes[:, 2] - boxes[:, 0]) / YOLO_INPUT_SIZE
+        xywh[:, 3] = (boxes[:, 3] - boxes[:, 1]) / YOLO_INPUT_SIZE
+        return xywh
+
+    def to_dicts(self):
+        return [
+            {
+                "x0": x0,
+                "y0": y0,
+                "x1": x1,
+                "y1": y1,
+                "class_id": class_id,
+                "class": label,
+                "confidence": confidence,
+                "track_id": None if track_id < 0 else track_id,
+                "track_uid": track_uid,
+            }
+            for (x0, y0, x1, y1), class_id, label, confidence, track_id, track_uid in zip(
+                self.boxes.tolist(),
+                self.class_id.tolist(),
+                self.labels.tolist(),
+                self.confidence.tolist(),
+                self.track_id.tolist(),
+                self.track_uid.tolist(),
+            )
+        ]
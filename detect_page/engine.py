@@ -0,0 +1,725 @@
+"""
+Configurable detection engine shared by every video detection front-end.
+
+A DetectionProfile holds what used to differ between detect.py,
+detectcpuonly.py and detect_box.py: device, weight files, capture policy and
+how captures are written. DetectionEngine connects the threaded pipeline, the
+background defect stage, the capture policy and the sink for one video at a
+time. This module does not import Qt, and torch is only imported once a
+model is loaded (see detect_page.resources).
+"""
+
+import contextlib
+import datetime
+import os
+import time
+from functools import partial
+
+import cv2
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from detect_page.backends import load_model
+from detect_page.capture_policy import (
+    CenterCapturePolicy,
+    SegmentCapturePolicy,
+    TrackCapturePolicy,
+)
+from detect_page.cascade import cascade_defects
+from detect_page.capture_sink import CaptureSink, defect_detections
+from detect_page.defect_stage import DefectStage
+from detect_page.detection_log import DetectionLogWriter
+from detect_page.frame_buffer import FrameBuffer
+from detect_page.gating import FrameGate
+from detect_page.image_writer import ImageEncoding, format_write_stats
+from detect_page.inference_server import RemoteModel, server_address
+from detect_page.metrics import StageTimings
+from detect_page.persistence import BufferedCsvWriter
+from detect_page.pipeline import YOLO_INPUT_SIZE, DetectionPipeline
+from detect_page.scheduler import FrameScheduler, format_summary
+from detect_page.tiling import Tiler
+from detect_page.tracker import ByteTracker
+
+WEIGHTS_DIR = os.path.join(os.path.dirname(__file__), "..", "weights")
+HISTORY_DIR = "history"
+DETECT_OUTPUT_DIR = "detect_output"
+
+
+def weights_path(file_name):
+    return os.path.join(WEIGHTS_DIR, file_name)
+
+
+def resolve_device(device):
+    """Map "auto" to CUDA when available, otherwise use the given device name."""
+    import torch
+
+    if device == "auto":
+        return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return torch.device(device)
+
+
+class DetectionProfile:
+    """
+    One deployment profile of the detection engine.
+
+    ``capture_policy`` is a factory called once per run, so stateful policies
+    never leak between videos; ``capture_policy_factory`` builds one by name
+    (detect_page.capture_policy).
+    """
+
+    def __init__(
+        self,
+        name,
+        anomaly_weights,
+        defect_weights,
+        device="auto",
+        capture_policy=CenterCapturePolicy,
+        draw_boxes_on_capture=False,
+        use_database=False,
+        batch_size=1,
+        max_batch_latency=0.05,
+        defect_queue_size=8,
+        schedule_policy="realtime",
+        max_latency=0.5,
+        backend="torch",
+        int8=False,
+        defect_mode="full",
+        cascade_imgsz=320,
+        cascade_margin=0.25,
+        gate_threshold=None,
+        gate_refresh_every=30,
+        inference_mode="resize",
+        tile_size=640,
+        tile_overlap=0.2,
+        tile_batch=16,
+        decode_process=False,
+        image_format="png",
+        png_compression=1,
+        jpeg_quality=95,
+        native_capture=True,
+        frame_buffer_mb=256,
+        clip_before=0.0,
+        clip_after=0.0,
+        detection_log=True,
+    ):
+        self.name = name
+        self.anomaly_weights = anomaly_weights
+        self.defect_weights = defect_weights
+        self.device = device
+        self.capture_policy = capture_policy
+        self.draw_boxes_on_capture = draw_boxes_on_capture
+        self.use_database = use_database
+        self.batch_size = batch_size
+        self.max_batch_latency = max_batch_latency
+        self.defect_queue_size = defect_queue_size
+        # See detect_page.scheduler for the policies
+        self.schedule_policy = schedule_policy
+        self.max_latency = max_latency
+        # "torch", "onnx" or "openvino", see detect_page.backends
+        self.backend = backend
+        # INT8 OpenVINO model built by detect_page.quantize
+        self.int8 = int8
+        # "full": defect model on the whole frame at 640; "cascade": on
+        # native-resolution anomaly crops at cascade_imgsz (detect_page.cascade)
+        self.defect_mode = defect_mode
+        self.cascade_imgsz = cascade_imgsz
+        self.cascade_margin = cascade_margin
+        # Frame-difference gate (detect_page.gating); None disables it
+        self.gate_threshold = gate_threshold
+        self.gate_refresh_every = gate_refresh_every
+        # "resize": whole frame at 640x640; "tiled": overlapping native tiles
+        # of tile_size, tile_batch per predict() (detect_page.tiling)
+        self.inference_mode = inference_mode
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_batch = tile_batch
+        # Decode in a child process into a shared-memory frame ring
+        # (detect_page.frame_ring) instead of a decoder thread
+        self.decode_process = decode_process
+        # Screenshot encoding: "png" at png_compression, lossless "webp" or
+        # "jpeg" at jpeg_quality (detect_page.image_writer)
+        self.image_format = image_format
+        self.png_compression = png_compression
+        self.jpeg_quality = jpeg_quality
+        # Screenshots from the decoded frame instead of the frame resized to
+        # the display; recent decoded frames are kept up to frame_buffer_mb
+        # (detect_page.frame_buffer, 0 disables it) for captures of earlier
+        # frames and clips of clip_before/clip_after seconds around captures
+        self.native_capture = native_capture
+        self.frame_buffer_mb = frame_buffer_mb
+        self.clip_before = clip_before
+        self.clip_after = clip_after
+        # Every frame's anomaly detections in a binary .dlog next to the FPS
+        # history (detect_page.detection_log)
+        self.detection_log = detection_log
+
+    def image_encoding(self):
+        return ImageEncoding(
+            self.image_format, self.png_compression, self.jpeg_quality
+        )
+
+
+PROFILES = {
+    # detect.py: GPU when available, each tracked defect captured once at the
+    # center and saved to the DB
+    "gpu-s": DetectionProfile(
+        "gpu-s",
+        "yolo11s-anomaly.pt",
+        "yolo11s-defect.pt",
+        device="auto",
+        capture_policy=TrackCapturePolicy,
+        use_database=True,
+        batch_size=4,
+        max_batch_latency=0.03,
+    ),
+    # detectcpuonly.py: CPU only, one capture per strip segment, boxes drawn in
+    "cpu-n": DetectionProfile(
+        "cpu-n",
+        "yolo11n-anomaly.pt",
+        "yolo11n-defect.pt",
+        device="cpu",
+        capture_policy=partial(SegmentCapturePolicy, first_at=4.96),
+        draw_boxes_on_capture=True,
+    ),
+    # cpu-n on the OpenVINO runtime (exported and parity-checked on first use)
+    "cpu-n-openvino": DetectionProfile(
+        "cpu-n-openvino",
+        "yolo11n-anomaly.pt",
+        "yolo11n-defect.pt",
+        device="cpu",
+        capture_policy=partial(SegmentCapturePolicy, first_at=4.96),
+        draw_boxes_on_capture=True,
+        batch_size=4,
+        max_batch_latency=0.03,
+        backend="openvino",
+    ),
+    # cpu-n with the INT8 models from python -m detect_page.quantize
+    "cpu-n-int8": DetectionProfile(
+        "cpu-n-int8",
+        "yolo11n-anomaly.pt",
+        "yolo11n-defect.pt",
+        device="cpu",
+        capture_policy=partial(SegmentCapturePolicy, first_at=4.96),
+        draw_boxes_on_capture=True,
+        batch_size=4,
+        max_batch_latency=0.03,
+        backend="openvino",
+        int8=True,
+    ),
+    # detect_box.py: training1 weights, one capture per strip segment, boxes drawn in
+    "training1": DetectionProfile(
+        "training1",
+        "training1-anomaly.pt",
+        "training1-defect.pt",
+        device="auto",
+        capture_policy=partial(SegmentCapturePolicy, first_at=4.96),
+        draw_boxes_on_capture=True,
+    ),
+}
+
+
+def load_models(profile):
+    """Load the anomaly and defect models of a profile on its device and backend.
+
+    With INFERENCE_SERVER set, returns clients of the shared inference server
+    (detect_page.inference_server) instead.
+    """
+    remote = server_address()
+    if remote is not None:
+        print(f"[INFO] Using inference server at {remote[0]}")
+        return tuple(
+            RemoteModel(
+                (weights, profile.backend, profile.device, profile.int8), *remote
+            )
+            for weights in (profile.anomaly_weights, profile.defect_weights)
+        )
+    device = resolve_device(profile.device)
+    backend = f"{profile.backend} (INT8)" if profile.int8 else profile.backend
+    print(f"[INFO] Using device: {device}, backend: {backend}")
+    anomaly_model = load_model(
+        weights_path(profile.anomaly_weights), profile.backend, device, profile.int8
+    )
+    defect_model = load_model(
+        weights_path(profile.defect_weights), profile.backend, device, profile.int8
+    )
+    return anomaly_model, defect_model
+
+
+def create_tiler(profile):
+    """Tiler for a profile in tiled mode, otherwise None."""
+    if profile.inference_mode != "tiled":
+        return None
+    return Tiler(profile.tile_size, profile.tile_overlap, profile.tile_batch)
+
+
+def _class_names(model):
+    """Class id -> name of a model, with string keys (for JSON)."""
+    names = getattr(model, "names", None) or {}
+    if not isinstance(names, dict):
+        names = dict(enumerate(names))
+    return {str(class_id): name for class_id, name in names.items()}
+
+
+def create_db_engine():
+    """Create the SQLAlchemy engine from DB_URL in the .env file."""
+    load_dotenv()
+    database_url = os.getenv("DB_URL")
+    if not database_url:
+        raise ValueError("DB_URL tidak ditemukan di file .env")
+    return create_engine(database_url)
+
+
+class DetectionEngine:
+    """
+    Runs one profile over one video at a time.
+
+    Callbacks are invoked from worker threads:
+
+    - ``on_frame(packet)`` for every processed frame; the packet also carries
+      ``tracks``, ``fps`` and ``screenshot_taken``, and its DetectionBatch
+      the ``track_id``/``track_uid`` columns (detect_page.tracker)
+    - ``on_finished()`` once when the video reaches its end
+    - ``on_error(error)`` once when inference failed for good and the run
+      ended early (see DetectionPipeline); call ``stop`` afterwards
+    - ``on_capture_done(combined_ms)`` after the defect model handled a capture
+
+    Besides returning True from ``update``, a capture policy may set
+    ``packet["capture_index"]`` to capture an earlier frame, taken from the
+    frame buffer or, once the buffer dropped it, from
+    ``packet["capture_frame"]``. ``packet["capture_clip"] =
+    (seconds_before, seconds_after)`` overrides the profile's clip around
+    the capture.
+
+    Pass ``sink`` to replace the default CaptureSink; it must provide
+    ``write(frame, detections, defects)``; ``reserve_image_name`` and
+    ``write_clip`` are optional. Engines that share one defect model
+    (detect_page.multistream) pass the same ``model_lock``.
+    """
+
+    def __init__(
+        self,
+        profile,
+        anomaly_model,
+        defect_model,
+        on_frame,
+        on_finished=None,
+        on_capture_done=None,
+        on_error=None,
+        db_engine=None,
+        sink=None,
+        model_lock=None,
+    ):
+        self.profile = profile
+        self.anomaly_model = anomaly_model
+        self.defect_model = defect_model
+        self.on_frame = on_frame
+        self.on_finished = on_finished
+        self.on_capture_done = on_capture_done
+        self.on_error = on_error
+        self.db_engine = db_engine
+        self._custom_sink = sink
+        # Serializes defect model calls when several engines share the model
+        self.model_lock = model_lock or contextlib.nullcontext()
+
+        self.sink = None
+        self.capture_policy = None
+        self.tracker = None
+        self.pipeline = None
+        self.defect_stage = None
+        self.fps_log_path = None
+        self.fps_log = None
+        self._model_fps = 0.0
+        self.detection_log_path = None
+        self.detection_log = None
+        self.annotation_csv_path = None
+        self.last_run_stats = None
+        self.timings = StageTimings()
+        self.frame_buffer = None
+        # (start_index, end_index, image_name) of clips waiting for their last frame
+        self._pending_clips = []
+        self._block_captures = False
+
+    @property
+    def is_running(self):
+        return self.pipeline is not None
+
+    @property
+    def start_time(self):
+        return self.pipeline.start_time if self.pipeline else 0
+
+    def start(
+        self,
+        video_path,
+        conf_threshold=0.0,
+        display_size=(YOLO_INPUT_SIZE, YOLO_INPUT_SIZE),
+        schedule_policy=None,
+        render=True,
+        overlay=False,
+        run_name=None,
+        shared_inference=False,
+        block_captures=False,
+    ):
+        """Create the run's output files and start processing ``video_path``.
+
+        ``schedule_policy`` overrides the profile's policy for this run.
+        ``display_size=None`` captures at native resolution and
+        ``render=False`` skips drawing the display frame (headless runs),
+        ``overlay=True`` leaves the boxes to the front-end.
+        ``run_name`` replaces the video file name in the output files and
+        gets its own screenshot folder. With ``shared_inference`` the
+        pipeline's frames are inferred by an outside driver.
+        ``block_captures=True`` waits for the defect queue instead of dropping
+        captures while it is full, which slows the anomaly stream down.
+        """
+        if self.is_running:
+            self.stop()
+
+        # --- Create unique fps_history file in history folder ---
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        base_name = run_name or os.path.splitext(os.path.basename(video_path))[0]
+        self.fps_log_path = os.path.join(HISTORY_DIR, f"{base_name}_{timestamp}.csv")
+        # Kept open for the run, rows are written in batches
+        self.fps_log = BufferedCsvWriter(
+            self.fps_log_path, ["time", "fps", "status", "gated"], create=True
+        )
+        self._model_fps = 0.0
+        self.detection_log = None
+        if self.profile.detection_log:
+            self.detection_log_path = os.path.join(
+                HISTORY_DIR, f"{base_name}_{timestamp}.dlog"
+            )
+            self.detection_log = DetectionLogWriter(
+                self.detection_log_path,
+                metadata={
+                    "video": str(video_path),
+                    "profile": self.profile.name,
+                    "started": timestamp,
+                    "class_names": _class_names(self.anomaly_model),
+                },
+            )
+
+        # --- Create annotation CSV path for this video ---
+        os.makedirs(DETECT_OUTPUT_DIR, exist_ok=True)
+        self.annotation_csv_path = os.path.join(
+            DETECT_OUTPUT_DIR, f"{base_name}_{timestamp}_annotations.csv"
+        )
+
+        self.sink = self._custom_sink or CaptureSink(
+            self.annotation_csv_path,
+            db_engine=self.db_engine if self.profile.use_database else None,
+            draw_boxes=self.profile.draw_boxes_on_capture,
+            screenshot_dir=(
+                os.path.join("screenshots", run_name) if run_name else "screenshots"
+            ),
+            encoding=self.profile.image_encoding(),
+        )
+        self.capture_policy = self.profile.capture_policy()
+        # Every detection the run shows can start a track
+        self.tracker = ByteTracker(high_conf=conf_threshold * 100)
+        self.timings = StageTimings()
+        self.frame_buffer = (
+            FrameBuffer(self.profile.frame_buffer_mb * 2**20)
+            if self.profile.frame_buffer_mb
+            else None
+        )
+        self._pending_clips = []
+        self._block_captures = block_captures
+
+        self.pipeline = DetectionPipeline(
+            video_path,
+            self.anomaly_model,
+            on_frame=self._handle_frame,
+            on_finished=self.on_finished,
+            on_error=self.on_error,
+            # Buffered rows still reach the disk while paused or between frames
+            on_idle=self._flush_due_rows,
+            idle_interval=self.fps_log.max_age,
+            conf_threshold=conf_threshold,
+            display_size=display_size,
+            batch_size=self.profile.batch_size,
+            max_batch_latency=self.profile.max_batch_latency,
+            scheduler=FrameScheduler(
+                schedule_policy or self.profile.schedule_policy,
+                max_latency=self.profile.max_latency,
+            ),
+            render=render,
+            overlay=overlay,
+            timings=self.timings,
+            gate=self._create_gate(),
+            tiler=create_tiler(self.profile),
+            decode_process=self.profile.decode_process,
+            frame_buffer=self.frame_buffer,
+        )
+        self.defect_stage = DefectStage(
+            self._classify_capture,
+            queue_size=self.profile.defect_queue_size,
+            on_result=self.on_capture_done,
+        )
+        self.pipeline.start(run_inference=not shared_inference)
+        self.defect_stage.start()
+
+    def _create_gate(self):
+        if not self.profile.gate_threshold:
+            return None
+        return FrameGate(
+            self.profile.gate_threshold, self.profile.gate_refresh_every
+        )
+
+    def stop(self):
+        """Stop the run; queued captures are still classified and written.
+
+        Buffered FPS and detection rows are written out and the CSV files
+        synced to disk before this returns.
+
+        Returns the scheduler statistics of the run (also kept in
+        ``last_run_stats``).
+        """
+        if self.pipeline is None:
+            return self.last_run_stats
+        self.pipeline.stop_processing()
+        if hasattr(self.capture_policy, "finish"):
+            # e.g. the best frame of a window that was still open
+            packet = self.capture_policy.finish()
+            if packet is not None:
+                self._capture(packet)
+        self.defect_stage.stop()
+        # Clips still waiting for frames get what was decoded
+        self._write_due_clips(None)
+        self.pipeline.stop()
+        if self.frame_buffer is not None:
+            # Release the frames; the counters stay for the run summary
+            self.frame_buffer.clear()
+        self.last_run_stats = self.pipeline.scheduler.summary()
+        self.pipeline = None
+        print(f"[INFO] Run statistics: {format_summary(self.last_run_stats)}")
+        self.fps_log.close()
+        if self.detection_log is not None:
+            self.detection_log.close()
+            print(
+                f"[INFO] Detection log: {self.detection_log_path} "
+                f"({self.detection_log.frames_written} frames, "
+                f"{self.detection_log.detections_written} detections)"
+            )
+        if hasattr(self.sink, "flush"):
+            # Buffered rows and screenshots still being encoded
+            self.sink.flush()
+            if hasattr(self.sink, "image_stats"):
+                print(
+                    "[INFO] Screenshots: "
+                    f"{format_write_stats(self.sink.image_stats.summary())}"
+                )
+        return self.last_run_stats
+
+    def pause(self):
+        if self.pipeline is not None:
+            self.pipeline.pause()
+
+    def resume(self):
+        if self.pipeline is not None:
+            self.pipeline.resume()
+
+    def set_conf_threshold(self, conf_threshold):
+        if self.pipeline is not None:
+            self.pipeline.conf_threshold = conf_threshold
+            self.tracker.high_conf = conf_threshold * 100
+
+    def set_display_size(self, display_size):
+        if self.pipeline is not None:
+            self.pipeline.display_size = display_size
+
+    def defect_stats(self):
+        if self.defect_stage is None:
+            return None
+        return self.defect_stage.stats()
+
+    def _handle_frame(self, packet):
+        """Track detections, apply the capture policy and log FPS (inference thread)."""
+        gated = packet.get("gated", False)
+        if not gated:
+            total_time = packet["total_time"]
+            self._model_fps = 1000.0 / total_time if total_time else 0
+        # A gated frame only took the gate's time; it keeps the FPS of the
+        # last inferred frame and is marked in the gated column
+        fps = self._model_fps
+
+        with self.timings.time("track"):
+            packet["tracks"] = self.tracker.update(packet["detections"])
+        if self.detection_log is not None:
+            chunk = self.detection_log.append(
+                packet["index"],
+                packet["elapsed"],
+                time.time(),
+                packet["detections"],
+                gated,
+            )
+            if chunk is not None:
+                self.pipeline.submit(self.detection_log.write_chunk, chunk)
+
+        screenshot_taken = False
+        if self.capture_policy.update(packet):
+            screenshot_taken = self._capture(packet)
+        self._write_due_clips(packet["index"])
+
+        packet["fps"] = fps
+        packet["screenshot_taken"] = screenshot_taken
+        self.pipeline.submit(
+            self._append_fps_log,
+            [
+                time.time(),
+                f"{fps:.2f}",
+                "yes" if screenshot_taken else "no",
+                "yes" if gated else "no",
+            ],
+        )
+        self.on_frame(packet)
+
+    def _capture(self, packet):
+        """Queue a capture for the defect stage; False if the queue was full."""
+        frames = self._capture_frames(packet)
+        if frames is None:
+            print(
+                f"[WARNING] Frame {packet['capture_index']} is no longer held; "
+                "capture skipped"
+            )
+            return False
+        capture_frame, source_frame = frames
+        # Named now, so the clip can carry the screenshot's name
+        image_name = None
+        if hasattr(self.sink, "reserve_image_name"):
+            image_name = self.sink.reserve_image_name()
+        taken = self.defect_stage.submit(
+            capture_frame,
+            packet.get("capture_detections", packet["detections"]),
+            anomaly_total_time=packet["total_time"],
+            source_frame=source_frame,
+            image_name=image_name,
+            block=self._block_captures,
+        )
+        if taken:
+            self._schedule_clip(packet, image_name)
+        elif hasattr(self.capture_policy, "release"):
+            # Let the policy try again on a later frame
+            self.capture_policy.release(packet)
+        return taken
+
+    def _capture_frames(self, packet):
+        """``(capture_frame, source_frame)`` of a capture, or None.
+
+        For the packet's own frame the capture frame is the native frame or,
+        unless the profile captures natively, the display-sized one. An
+        earlier ``capture_index`` is captured at native resolution from the
+        frame buffer, else from ``packet["capture_frame"]``; None if neither
+        holds it any more (never a different frame).
+        """
+        index = packet.get("capture_index", packet["index"])
+        if index == packet["index"]:
+            source_frame = packet["frame"]
+            if self.profile.native_capture:
+                return source_frame, source_frame
+            return packet["clean_frame"], source_frame
+        earlier = None
+        if self.frame_buffer is not None:
+            earlier = self.frame_buffer.get(index)
+        if earlier is None:
+            earlier = packet.get("capture_frame")
+        if earlier is None:
+            return None
+        return earlier, earlier
+
+    def _schedule_clip(self, packet, image_name=None):
+        if self.frame_buffer is None:
+            return
+        before, after = packet.get(
+            "capture_clip", (self.profile.clip_before, self.profile.clip_after)
+        )
+        if not before and not after:
+            return
+        fps = self.pipeline.frame_rate or 30
+        index = packet.get("capture_index", packet["index"])
+        self._pending_clips.append(
+            (index - round(before * fps), index + round(after * fps), image_name)
+        )
+
+    def _write_due_clips(self, current_index):
+        """Hand clips whose last frame was processed to the sink (all if None)."""
+        if not self._pending_clips:
+            return
+        waiting = []
+        for start, end, image_name in self._pending_clips:
+            if current_index is not None and end > current_index:
+                waiting.append((start, end, image_name))
+                continue
+            frames = [frame for _, frame in self.frame_buffer.clip(start, end)]
+            if frames and hasattr(self.sink, "write_clip"):
+                self.pipeline.submit(
+                    self.sink.write_clip,
+                    frames,
+                    self.pipeline.frame_rate or 30,
+                    image_name,
+                )
+        self._pending_clips = waiting
+
+    def _append_fps_log(self, row):
+        """Buffer one FPS history row (persistence thread).
+
+        Runs for every frame, so it also writes out the sink's rows once
+        they are old enough.
+        """
+        self.fps_log.write_row(row)
+        if hasattr(self.sink, "flush_if_due"):
+            self.sink.flush_if_due()
+
+    def _flush_due_rows(self):
+        """Write out buffered rows that are old enough (idle persistence thread)."""
+        self.fps_log.flush_if_due()
+        if hasattr(self.sink, "flush_if_due"):
+            self.sink.flush_if_due()
+
+    def _write_capture(self, frame, detections, defects, image_name=None):
+        """Hand a classified capture to the sink (persistence thread)."""
+        with self.timings.time("persist"):
+            if image_name is None:
+                self.sink.write(frame, detections, defects)
+            else:
+                self.sink.write(frame, detections, defects, image_name=image_name)
+
+    def _classify_capture(
+        self,
+        frame,
+        detections,
+        anomaly_total_time=None,
+        source_frame=None,
+        image_name=None,
+    ):
+        """Run the defect model on a captured frame (defect stage worker).
+
+        In cascade mode the defect model only sees crops of ``source_frame``
+        (the native-resolution frame) around the anomaly ``detections``.
+        Returns the combined anomaly + defect time in ms, or None.
+        """
+        profile = self.profile
+        with self.model_lock:
+            start_defect = time.time()
+            if profile.defect_mode == "cascade":
+                defects = cascade_defects(
+                    self.defect_model,
+                    frame if source_frame is None else source_frame,
+                    detections,
+                    imgsz=profile.cascade_imgsz,
+                    margin=profile.cascade_margin,
+                )
+            else:
+                frame_yolo = cv2.resize(frame, (YOLO_INPUT_SIZE, YOLO_INPUT_SIZE))
+                defect_results = self.defect_model.predict(frame_yolo, verbose=False)
+                defects = defect_detections(defect_results, self.defect_model.names)
+        defect_time = (time.time() - start_defect) * 1000  # ms
+        self.timings.add("defect", defect_time / 1000)
+
+        self.pipeline.submit(
+            self._write_capture, frame, detections, defects, image_name
+        )
+
+        if anomaly_total_time is None:
+            return None
+        return anomaly_total_time + defect_time
@@ -4,7 +4,7 @@ import sys
 import time
 
 import cv2
-import torch
+from PySide6.QtCore import QObject, Signal
 from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import (
     QApplication,
@@ -14,15 +14,31 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QWidget,
 )
-from ultralytics import YOLO
 
-# Load YOLO model
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-MODEL_PATH = os.path.join(
-    os.path.dirname(__file__), "..", "weights", "training2-300-defect.pt"
+from detect_page import resources
+from detect_page.detections import DetectionBatch
+from detect_page.image_writer import (
+    ImageEncoding,
+    WriteStats,
+    format_write_stats,
+    shared_writer,
 )
-model = YOLO(MODEL_PATH).to(device)
+from detect_page.pipeline import predict_batched
+
+# Loaded on first use (CUDA when available), see detect_page.resources
+MODEL_FILE = "training2-300-defect.pt"
+
+# Number of images sent to the model per predict() call
+BATCH_SIZE = 8
+
+# Saved images are encoded on the shared background writer
+IMAGE_ENCODING = ImageEncoding("png", png_compression=1)
+
+
+class ModelSignals(QObject):
+    """Delivers the finished model future onto the GUI thread."""
+
+    ready = Signal(object)
 
 
 class ImageAnnotator(QWidget):
@@ -46,6 +62,13 @@ class ImageAnnotator(QWidget):
 
         self.images_info = []  # List of dicts: {img_path, detections, drawn_img}
         self.folder_path = None
+        # Sorted image files waiting for the model
+        self._pending_files = None
+
+        # Start loading the model while the window is shown
+        self.model_signals = ModelSignals(self)
+        self.model_signals.ready.connect(self._annotate_folder)
+        resources.model_future(MODEL_FILE)
 
     def load_folder(self):
         folder_path = QFileDialog.getExistingDirectory(self, "Select Folder", "")
@@ -68,20 +91,55 @@ class ImageAnnotator(QWidget):
             self.btn_save.setEnabled(False)
             return
 
-        for idx, img_path in enumerate(sorted(img_files)):
-            img = cv2.imread(img_path)
-            if img is None:
-                continue
-            img_resized = cv2.resize(img, (640, 640))
-            results = model.predict(img_resized)
-            detection_data = []
-            for result in results:
-                for box in result.boxes:
-                    x0, y0, x1, y1 = map(int, box.xyxy[0].tolist())
-                    class_id = int(box.cls[0])
-                    class_name = model.names[class_id]
-                    confidence = float(box.conf[0]) * 100
+        self._pending_files = sorted(img_files)
+        # Never wait for the model on the GUI thread
+        future = resources.model_future(MODEL_FILE)
+        if not future.done():
+            self.image_label.setText("Loading model...")
+            self.btn_save.setEnabled(False)
+            future.add_done_callback(self.model_signals.ready.emit)
+            return
+        self._annotate_folder(future)
 
+    def _annotate_folder(self, future):
+        """Run the loaded model over the pending folder (GUI thread)."""
+        if self._pending_files is None:
+            return
+        img_files = self._pending_files
+        self._pending_files = None
+        error = future.exception()
+        if error is not None:
+            print(f"[ERROR] Gagal memuat model: {error}")
+            self.image_label.setText(f"Failed to load model: {error}")
+            self.btn_save.setEnabled(False)
+            return
+        model = future.result()
+
+        for start in range(0, len(img_files), BATCH_SIZE):
+            batch_paths = []
+            batch_images = []
+            for img_path in img_files[start : start + BATCH_SIZE]:
+                img = cv2.imread(img_path)
+                if img is None:
+                    continue
+                batch_paths.append(img_path)
+                batch_images.append(cv2.resize(img, (640, 640)))
+
+            try:
+                results = predict_batched(model, batch_images)
+            except ConnectionError as e:
+                # Keep the images annotated so far
+                print(f"[ERROR] {e}")
+                break
+            for img_path, img_resized, result in zip(
+                batch_paths, batch_images, results
+            ):
+                detections = DetectionBatch.from_result(result, model.names)
+                for (x0, y0, x1, y1), class_name, confidence in zip(
+                    detections.boxes.tolist(),
+                    detections.labels.tolist(),
+                    detections.confidence.tolist(),
+                ):
                     cv2.rectangle(img_resized, (x0, y0), (x1, y1), (0, 255, 0), 2)
                     label_text = f"{class_name} {confidence:.1f}%"
                     cv2.putText(
@@ -93,31 +151,22 @@ class ImageAnnotator(QWidget):
                         (255, 0, 0),
                         1,
                     )
-                    detection_data.append(
-                        {
-                            "class_id": class_id,
-                            "class": class_name,
-                            "confidence": confidence,
-                            "x0": x0,
-                            "y0": y0,
-                            "x1": x1,
-                            "y1": y1,
-                        }
+                self.images_info.append(
+                    {
+                        "img_path": img_path,
+                        "detections": detections,
+                        "drawn_img": img_resized,
+                    }
+                )
+                # Display only the first image
+                if len(self.images_info) == 1:
+                    img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
+                    h, w, ch = img_rgb.shape
+                    bytes_per_line = ch * w
+                    q_img = QImage(
+                        img_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888
                     )
-            self.images_info.append(
-                {
-                    "img_path": img_path,
-                    "detections": detection_data,
-                    "drawn_img": img_resized.copy(),
-                }
-            )
-            # Display only the first image
-            if idx == 0:
-                img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
-                h, w, ch = img_rgb.shape
-                bytes_per_line = ch * w
-                q_img = QImage(img_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                self.image_label.setPixmap(QPixmap.fromImage(q_img))
+                    self.image_label.setPixmap(QPixmap.fromImage(q_img))
 
         if self.images_info:
             self.btn_save.setEnabled(True)
@@ -130,7 +179,7 @@ class ImageAnnotator(QWidget):
             return
 
         # Use model file name (without extension) for folder and CSV
-        model_base = os.path.splitext(os.path.basename(MODEL_PATH))[0]
+        model_base = os.path.splitext(MODEL_FILE)[0]
         screenshot_dir = os.path.join("screenshots", model_base)
         os.makedirs(screenshot_dir, exist_ok=True)
         detect_output_dir = "detect_output"
@@ -140,6 +189,8 @@ class ImageAnnotator(QWidget):
             detect_output_dir, f"{model_base}_{timestamp}_annotations.csv"
         )
         write_header = not os.path.exists(csv_path)
+        writer_pool = shared_writer()
+        image_stats = WriteStats()
 
         with open(csv_path, "a", newline="", encoding="utf-8") as csvfile:
             writer = csv.writer(csvfile)
@@ -159,30 +210,25 @@ class ImageAnnotator(QWidget):
             for info in self.images_info:
                 base_name = os.path.splitext(os.path.basename(info["img_path"]))[0]
                 img_save_path = os.path.join(
-                    screenshot_dir, f"{base_name}_{timestamp}.png"
+                    screenshot_dir,
+                    f"{base_name}_{timestamp}{IMAGE_ENCODING.extension}",
                 )
-                cv2.imwrite(img_save_path, info["drawn_img"])
-                for det in info["detections"]:
-                    class_id = det["class_id"]
-                    class_name = det["class"]
-                    confidence = det["confidence"]
-                    x_center = (det["x0"] + det["x1"]) / 2 / 640
-                    y_center = (det["y0"] + det["y1"]) / 2 / 640
-                    width = (det["x1"] - det["x0"]) / 640
-                    height = (det["y1"] - det["y0"]) / 640
-                    writer.writerow(
-                        [
-                            img_save_path,
-                            class_id,
-                            class_name,
-                            confidence,
-                            x_center,
-                            y_center,
-                            width,
-                            height,
-                        ]
+                writer_pool.submit(
+                    img_save_path, info["drawn_img"], IMAGE_ENCODING, image_stats
+                )
+                detections = info["detections"]
+                writer.writerows(
+                    [img_save_path, class_id, class_name, confidence, *xywh]
+                    for class_id, class_name, confidence, xywh in zip(
+                        detections.class_id.tolist(),
+                        detections.labels.tolist(),
+                        detections.confidence.tolist(),
+                        detections.normalized_xywh().tolist(),
                     )
+                )
+        image_stats.wait()
         print(f"[INFO] All annotations saved as {csv_path}")
+        print(f"[INFO] Images: {format_write_stats(image_stats.summary())}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+"""
+Bounded history of recently decoded frames.
+
+The pipeline's decoder adds every frame it decodes, at native resolution
+and without a copy (each decoded frame is a fresh array), indexed by its
+frame number. Captures can then use the native frame of any recent index,
+also one from before the policy fired, and cut short pre/post clips without
+decoding the video again. The oldest frames are dropped once the frames
+held exceed ``byte_budget``; frames the scheduler skipped with ``grab()``
+were never decoded and are missing from the history.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class FrameBuffer:
+    """Recent frames by frame index; safe to use from several threads."""
+
+    def __init__(self, byte_budget):
+        self.byte_budget = byte_budget
+        # Frame index -> (frame, elapsed); indices arrive in increasing order
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.added = 0
+        self.evicted = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+    def add(self, index, frame, elapsed=None):
+        """Keep ``frame`` (not copied, must not be modified afterwards)."""
+        with self._lock:
+            previous = self._frames.pop(index, None)
+            if previous is not None:
+                self.bytes -= previous[0].nbytes
+            self._frames[index] = (frame, elapsed)
+            self.bytes += frame.nbytes
+            self.added += 1
+            # Always keep the newest frame, even if it alone exceeds the budget
+            while self.bytes > self.byte_budget and len(self._frames) > 1:
+                _, (oldest, _) = self._frames.popitem(last=False)
+                self.bytes -= oldest.nbytes
+                self.evicted += 1
+
+    def get(self, index):
+        """The frame with ``index``, or None once it was dropped (or never decoded)."""
+        with self._lock:
+            entry = self._frames.get(index)
+        return None if entry is None else entry[0]
+
+    def clip(self, start, end):
+        """``[(index, frame)]`` of the held frames with start <= index <= end."""
+        with self._lock:
+            return [
+                (index, frame)
+                for index, (frame, _) in self._frames.items()
+                if start <= index <= end
+            ]
+
+    def span(self):
+        """``(first_index, last_index)`` of the held frames, or None when empty."""
+        with self._lock:
+            if not self._frames:
+                return None
+            return next(iter(self._frames)), next(reversed(self._frames))
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames": len(self._frames),
+                "bytes": self.bytes,
+                "byte_budget": self.byte_budget,
+                "added": self.added,
+                "evicted": self.evicted,
+            }
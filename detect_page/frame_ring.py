@@ -0,0 +1,288 @@
+"""
+Shared-memory frame ring between a decoder process and its readers.
+
+Pickling every 1080p frame through a multiprocessing.Queue costs more than
+decoding it. FrameRing keeps ``slots`` fixed-size frame slots in one
+``multiprocessing.shared_memory`` block, viewed as NumPy arrays, next to a
+small header:
+
+- write cursor: sequence number of the next frame to write
+- claim cursor: sequence number of the next frame a reader takes
+- per slot: the sequence number it holds, its frame index and video time,
+  and a busy flag that the reader clears with ``release()``
+
+One writer fills the slots in order and waits for a slot to be released
+before reusing it. Readers ``claim()`` frames in order and get a zero-copy
+view that stays valid until they release it; several reader processes can
+share a ring when they pass the same multiprocessing lock. Cursors are
+polled, not signalled, so no synchronization object has to be shared
+between unrelated processes.
+
+DecoderProcess runs cv2 decoding in a child process behind a ring and looks
+like a cv2.VideoCapture to DetectionPipeline (``decode_process=True``).
+"""
+
+import contextlib
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+# Header fields (int64)
+_WRITE, _CLAIM, _CLOSED, _STOPPED = range(4)
+_HEADER_FIELDS = 8
+_POLL_INTERVAL = 0.0005
+
+
+class RingFrame:
+    """A claimed frame: ``frame`` is a view into shared memory until released."""
+
+    __slots__ = ("seq", "index", "elapsed", "frame")
+
+    def __init__(self, seq, index, elapsed, frame):
+        self.seq = seq
+        self.index = index
+        self.elapsed = elapsed
+        self.frame = frame
+
+
+class FrameRing:
+    """Fixed-size ring of ``shape`` uint8 frames in shared memory."""
+
+    def __init__(self, shm, shape, slots, owner, lock=None):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = owner
+        self.lock = lock or contextlib.nullcontext()
+
+        offset = 0
+        self._header = np.ndarray((_HEADER_FIELDS,), np.int64, shm.buf, offset)
+        offset += self._header.nbytes
+        self._slot_seq = np.ndarray((slots,), np.int64, shm.buf, offset)
+        offset += self._slot_seq.nbytes
+        self._busy = np.ndarray((slots,), np.int64, shm.buf, offset)
+        offset += self._busy.nbytes
+        self._meta = np.ndarray((slots, 2), np.float64, shm.buf, offset)
+        offset += self._meta.nbytes
+        self._frames = np.ndarray((slots, *self.shape), np.uint8, shm.buf, offset)
+
+    @staticmethod
+    def nbytes(shape, slots):
+        return 8 * (_HEADER_FIELDS + 4 * slots) + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape, slots=8, lock=None):
+        shm = shared_memory.SharedMemory(create=True, size=cls.nbytes(shape, slots))
+        ring = cls(shm, shape, slots, owner=True, lock=lock)
+        ring._header[:] = 0
+        ring._slot_seq[:] = -1
+        ring._busy[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, shape, slots=8, lock=None):
+        # Children share the creator's resource tracker, so the block is
+        # tracked once and unlinked by its creator only
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, shape, slots, owner=False, lock=lock)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def closed(self):
+        return bool(self._header[_CLOSED])
+
+    @property
+    def stopped(self):
+        return bool(self._header[_STOPPED])
+
+    @property
+    def pending(self):
+        """Frames written but not yet claimed."""
+        return int(self._header[_WRITE] - self._header[_CLAIM])
+
+    @property
+    def exhausted(self):
+        """True once the writer closed the ring and every frame was claimed."""
+        return self.closed and self.pending <= 0
+
+    def write(self, frame, index, elapsed, timeout=None):
+        """
+        Copy ``frame`` into the next slot.
+
+        Waits for the slot to be released; returns False when the readers
+        stopped the ring or ``timeout`` seconds passed.
+        """
+        seq = int(self._header[_WRITE])
+        slot = seq % self.slots
+        deadline = None if timeout is None else time.time() + timeout
+        while self._busy[slot]:
+            if self.stopped or (deadline is not None and time.time() >= deadline):
+                return False
+            time.sleep(_POLL_INTERVAL)
+        if self.stopped:
+            return False
+        np.copyto(self._frames[slot], frame)
+        self._meta[slot] = (index, elapsed)
+        self._slot_seq[slot] = seq
+        self._busy[slot] = 1
+        # Publish the frame only after the slot is complete
+        self._header[_WRITE] = seq + 1
+        return True
+
+    def claim(self, timeout=None):
+        """
+        Take the next written frame as a RingFrame, in write order.
+
+        Returns None when the ring is exhausted, stopped or ``timeout``
+        seconds passed without a new frame.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.stopped:
+            with self.lock:
+                seq = int(self._header[_CLAIM])
+                if seq < self._header[_WRITE]:
+                    self._header[_CLAIM] = seq + 1
+                    slot = seq % self.slots
+                    index, elapsed = self._meta[slot]
+                    return RingFrame(seq, int(index), float(elapsed), self._frames[slot])
+            if self.closed or (deadline is not None and time.time() >= deadline):
+                return None
+            time.sleep(_POLL_INTERVAL)
+        return None
+
+    def release(self, seq):
+        """Hand the slot of frame ``seq`` back to the writer."""
+        self._busy[seq % self.slots] = 0
+
+    def close_writer(self):
+        """Mark the end of the stream; readers drain the remaining frames."""
+        self._header[_CLOSED] = 1
+
+    def stop(self):
+        """Readers are done: the writer stops at its next write."""
+        self._header[_STOPPED] = 1
+
+    def detach(self):
+        # Views must go before the buffer can be closed
+        self._header = self._slot_seq = self._busy = self._meta = self._frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _decoder_main(source, slots, conn):
+    """Child process: decode ``source`` into a new ring until the end or stop."""
+    capture = cv2.VideoCapture(source)
+    ret, frame = capture.read()
+    if not ret:
+        capture.release()
+        conn.send(None)
+        return
+    frame_rate = capture.get(cv2.CAP_PROP_FPS)
+    frame_duration = 1.0 / frame_rate if frame_rate > 0 else 0.033
+    ring = FrameRing.create(frame.shape, slots)
+    conn.send((ring.name, frame.shape, frame_rate))
+    # Keep the block alive until the parent has attached
+    conn.recv()
+    index = 0
+    try:
+        while ret and ring.write(frame, index, index * frame_duration):
+            index += 1
+            ret, frame = capture.read()
+    finally:
+        ring.close_writer()
+        capture.release()
+        ring.detach()
+
+
+class DecoderProcess:
+    """
+    cv2.VideoCapture stand-in that decodes in a child process.
+
+    Provides the calls DetectionPipeline makes (``get``, ``grab``, ``read``,
+    ``release``). ``read()`` copies the frame out of its slot once and frees
+    the slot right away, because pipeline packets outlive the ring slots;
+    readers that can release in time use ``ring.claim()`` for zero-copy views.
+    """
+
+    def __init__(self, source, slots=8, start_timeout=30.0):
+        self.ring = None
+        self.frame_rate = 0.0
+        self.shape = None
+        if os.name == "posix":
+            # Start the tracker here so the child inherits it instead of
+            # starting its own (the ring would then be tracked twice)
+            from multiprocessing import resource_tracker
+
+            resource_tracker.ensure_running()
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_decoder_main,
+            args=(source, slots, child_conn),
+            name="detect-decoder-process",
+            daemon=True,
+        )
+        self.process.start()
+        if not parent_conn.poll(start_timeout):
+            print(f"[WARNING] Decoder process for {source} did not start")
+            return
+        info = parent_conn.recv()
+        if info is None:
+            return
+        name, self.shape, self.frame_rate = info
+        self.ring = FrameRing.attach(name, self.shape, slots)
+        parent_conn.send(True)
+
+    def isOpened(self):
+        return self.ring is not None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.frame_rate
+        if self.shape is not None and prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.shape[1])
+        if self.shape is not None and prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.shape[0])
+        return 0.0
+
+    def _claim(self):
+        if self.ring is None:
+            return None
+        while True:
+            item = self.ring.claim(timeout=0.5)
+            if item is not None or self.ring.exhausted:
+                return item
+            if not self.process.is_alive() and self.ring.pending <= 0:
+                return None
+
+    def grab(self):
+        item = self._claim()
+        if item is None:
+            return False
+        self.ring.release(item.seq)
+        return True
+
+    def read(self):
+        item = self._claim()
+        if item is None:
+            return False, None
+        frame = item.frame.copy()
+        self.ring.release(item.seq)
+        return True, frame
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.stop()
+        self.process.join(timeout=5.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        if self.ring is not None:
+            self.ring.detach()
+            self.ring = None
@@ -0,0 +1,87 @@
+"""
+Display surface for the detection pages.
+
+FrameView wraps the pipeline's display frame (BGR, already resized to the
+label) as a ``Format_BGR888`` QImage over the NumPy buffer, without a color
+conversion, copy or QPixmap, and paints the detection boxes and labels on
+top with QPainter. The pipeline therefore no longer copies the clean frame
+to burn boxes into it (``overlay=True``).
+"""
+
+from PySide6.QtCore import QPointF, QRectF, Qt
+from PySide6.QtGui import QColor, QFont, QImage, QPainter, QPen
+from PySide6.QtWidgets import QLabel
+
+from detect_page.detections import YOLO_INPUT_SIZE, DetectionBatch
+
+OVERLAY_COLOR = QColor(0, 255, 0)
+
+
+class FrameView(QLabel):
+    """
+    QLabel that shows a BGR frame with a detection overlay.
+
+    Text set with ``setText`` (status messages) replaces the frame until
+    the next ``set_frame``.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._frame = None  # Keeps the buffer behind _image alive
+        self._image = None
+        self._detections = DetectionBatch.empty()
+        self._pen = QPen(OVERLAY_COLOR, 2)
+        self._font = QFont()
+        self._font.setPointSize(9)
+        self._font.setBold(True)
+
+    def set_frame(self, frame, detections=()):
+        """Show ``frame`` (contiguous BGR uint8) and ``detections`` (640x640 space)."""
+        height, width = frame.shape[:2]
+        self._frame = frame
+        self._image = QImage(
+            frame.data, width, height, frame.strides[0], QImage.Format_BGR888
+        )
+        self._detections = DetectionBatch.coerce(detections)
+        if self.text():
+            super().setText("")
+        self.update()
+
+    def clear_frame(self):
+        self._frame = None
+        self._image = None
+        self._detections = DetectionBatch.empty()
+        self.update()
+
+    def setText(self, text):
+        self.clear_frame()
+        super().setText(text)
+
+    def paintEvent(self, event):
+        if self._image is None:
+            super().paintEvent(event)
+            return
+        painter = QPainter(self)
+        target = QRectF(self.rect())
+        painter.drawImage(target, self._image)
+
+        detections = self._detections
+        if len(detections):
+            scale_x = target.width() / YOLO_INPUT_SIZE
+            scale_y = target.height() / YOLO_INPUT_SIZE
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(self._pen)
+            painter.setFont(self._font)
+            painter.setBrush(Qt.NoBrush)
+            for (x0, y0, x1, y1), class_name, confidence in zip(
+                detections.boxes.tolist(),
+                detections.labels.tolist(),
+                detections.confidence.tolist(),
+            ):
+                x0, x1 = x0 * scale_x, x1 * scale_x
+                y0, y1 = y0 * scale_y, y1 * scale_y
+                painter.drawRect(QRectF(x0, y0, x1 - x0, y1 - y0))
+                painter.drawText(
+                    QPointF(x0, max(y0 - 6, 12)), f"{class_name} {confidence:.1f}%"
+                )
+        painter.end()
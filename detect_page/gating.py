@@ -0,0 +1,62 @@
+"""
+Frame-difference gate in front of the anomaly model.
+
+During line stops and empty-belt periods consecutive frames hardly change.
+FrameGate compares a small grayscale thumbnail of each frame with the one
+of the last frame that was actually inferred. The thumbnail is split into
+cells of ``cell`` x ``cell`` thumbnail pixels (80x80 pixels of a 720p
+frame by default) and the largest mean absolute difference of any cell is
+compared with ``threshold`` in gray levels: a small defect moving over a
+still strip changes its own cells a lot but the whole-frame average hardly
+at all. Below the threshold the pipeline reuses the last inferred frame's
+detections instead of calling the model. Every ``refresh_every`` frames
+inference is forced, so nothing stays stale for long.
+"""
+
+import cv2
+import numpy as np
+
+
+class FrameGate:
+    """Decides per frame whether the anomaly model has to run."""
+
+    def __init__(self, threshold=3.0, refresh_every=30, size=(64, 36), cell=4):
+        self.threshold = threshold
+        self.refresh_every = refresh_every
+        self.size = size
+        self.cell = cell
+        self.reset()
+
+    def reset(self):
+        self.reference = None
+        self.since_refresh = 0
+        self.last_difference = None
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.int16)
+
+    def _difference(self, thumbnail):
+        """Largest mean absolute difference of a cell to the reference."""
+        difference = np.abs(thumbnail - self.reference).astype(np.float32)
+        width, height = self.size
+        cells = cv2.resize(
+            difference,
+            (max(1, width // self.cell), max(1, height // self.cell)),
+            interpolation=cv2.INTER_AREA,
+        )
+        return float(cells.max())
+
+    def should_infer(self, frame):
+        """True when ``frame`` differs enough from the last inferred frame."""
+        thumbnail = self._thumbnail(frame)
+        if self.reference is not None and self.since_refresh < self.refresh_every:
+            self.last_difference = self._difference(thumbnail)
+            if self.last_difference < self.threshold:
+                self.since_refresh += 1
+                return False
+        self.reference = thumbnail
+        self.since_refresh = 0
+        return True
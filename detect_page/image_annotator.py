@@ -3,7 +3,7 @@ import sys
 import time
 
 import cv2
-import torch
+from PySide6.QtCore import QObject, Signal
 from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import (
     QApplication,
@@ -13,15 +13,22 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QWidget,
 )
-from ultralytics import YOLO
 
-# Load YOLO model
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+from detect_page import resources
+from detect_page.detections import DetectionBatch
+from detect_page.image_writer import ImageEncoding, shared_writer
 
-MODEL_PATH = os.path.join(
-    os.path.dirname(__file__), "..", "weights", "training2-100-defect.pt"
-)
-model = YOLO(MODEL_PATH).to(device)
+# Loaded on first use (CUDA when available), see detect_page.resources
+MODEL_FILE = "training2-100-defect.pt"
+
+# Saved images are encoded on the shared background writer
+IMAGE_ENCODING = ImageEncoding("png", png_compression=1)
+
+
+class ModelSignals(QObject):
+    """Delivers the finished model future onto the GUI thread."""
+
+    ready = Signal(object)
 
 
 class ImageAnnotator(QWidget):
@@ -44,7 +51,14 @@ class ImageAnnotator(QWidget):
         self.btn_save.clicked.connect(self.save_annotation)
 
         self.current_image = None
-        self.current_detections = []
+        self.current_detections = DetectionBatch.empty()
+        # (file_path, image) waiting for the model
+        self._pending_image = None
+
+        # Start loading the model while the window is shown
+        self.model_signals = ModelSignals(self)
+        self.model_signals.ready.connect(self._annotate_image)
+        resources.model_future(MODEL_FILE)
 
     def load_image(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -60,56 +74,72 @@ class ImageAnnotator(QWidget):
                 self.btn_save.setEnabled(False)
                 return
 
-            img_resized = cv2.resize(img, (640, 640))
+            self._pending_image = (file_path, img)
+            # Never wait for the model on the GUI thread
+            future = resources.model_future(MODEL_FILE)
+            if not future.done():
+                self.image_label.setText("Loading model...")
+                self.btn_save.setEnabled(False)
+                future.add_done_callback(self.model_signals.ready.emit)
+                return
+            self._annotate_image(future)
+
+    def _annotate_image(self, future):
+        """Run the loaded model on the pending image (GUI thread)."""
+        if self._pending_image is None:
+            return
+        file_path, img = self._pending_image
+        self._pending_image = None
+        error = future.exception()
+        if error is not None:
+            print(f"[ERROR] Gagal memuat model: {error}")
+            self.image_label.setText(f"Failed to load model: {error}")
+            self.btn_save.setEnabled(False)
+            return
+        model = future.result()
+
+        img_resized = cv2.resize(img, (640, 640))
+        try:
             results = model.predict(img_resized)
-            detection_data = []
-            for result in results:
-                for box in result.boxes:
-                    x0, y0, x1, y1 = map(int, box.xyxy[0].tolist())
-                    class_id = int(box.cls[0])
-                    class_name = model.names[class_id]
-                    confidence = float(box.conf[0]) * 100
-
-                    cv2.rectangle(
-                        img_resized,
-                        (x0, y0),
-                        (x1, y1),
-                        (0, 255, 0),
-                        2,
-                    )
-                    label_text = f"{class_name} {confidence:.1f}%"
-                    cv2.putText(
-                        img_resized,
-                        label_text,
-                        (x0, y0 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        (255, 0, 0),
-                        1,
-                    )
-
-                    detection_data.append(
-                        {
-                            "class_id": class_id,
-                            "class": class_name,
-                            "confidence": confidence,
-                            "x0": x0,
-                            "y0": y0,
-                            "x1": x1,
-                            "y1": y1,
-                        }
-                    )
-
-            # Show image with bounding boxes
-            img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
-            h, w, ch = img_rgb.shape
-            bytes_per_line = ch * w
-            q_img = QImage(img_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            self.image_label.setPixmap(QPixmap.fromImage(q_img))
-            self.current_image = img_resized
-            self.current_detections = detection_data
-            self.btn_save.setEnabled(True)
-            self.loaded_file_path = file_path
+        except ConnectionError as e:
+            print(f"[ERROR] {e}")
+            self.image_label.setText("Inference server unavailable.")
+            self.btn_save.setEnabled(False)
+            return
+        detections = DetectionBatch.from_results(results, model.names)
+        for (x0, y0, x1, y1), class_name, confidence in zip(
+            detections.boxes.tolist(),
+            detections.labels.tolist(),
+            detections.confidence.tolist(),
+        ):
+            cv2.rectangle(
+                img_resized,
+                (x0, y0),
+                (x1, y1),
+                (0, 255, 0),
+                2,
+            )
+            label_text = f"{class_name} {confidence:.1f}%"
+            cv2.putText(
+                img_resized,
+                label_text,
+                (x0, y0 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (255, 0, 0),
+                1,
+            )
+
+        # Show image with bounding boxes
+        img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
+        h, w, ch = img_rgb.shape
+        bytes_per_line = ch * w
+        q_img = QImage(img_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
+        self.image_label.setPixmap(QPixmap.fromImage(q_img))
+        self.current_image = img_resized
+        self.current_detections = detections
+        self.btn_save.setEnabled(True)
+        self.loaded_file_path = file_path
 
     def save_annotation(self):
         if self.current_image is None or not self.current_detections:
@@ -123,19 +153,17 @@ class ImageAnnotator(QWidget):
         filename_base = os.path.join(screenshot_dir, f"{base_name}_{timestamp}")
 
         # Save image
-        image_path = f"{filename_base}.png"
-        cv2.imwrite(image_path, self.current_image)
-        print(f"[INFO] Image saved as {image_path}")
+        image_path = f"{filename_base}{IMAGE_ENCODING.extension}"
+        shared_writer().submit(image_path, self.current_image, IMAGE_ENCODING)
+        print(f"[INFO] Image queued as {image_path}")
 
         # Save annotation
         txt_path = f"{filename_base}.txt"
         with open(txt_path, "w", encoding="utf-8") as f:
-            for det in self.current_detections:
-                class_id = det["class_id"]
-                x_center = (det["x0"] + det["x1"]) / 2 / 640
-                y_center = (det["y0"] + det["y1"]) / 2 / 640
-                width = (det["x1"] - det["x0"]) / 640
-                height = (det["y1"] - det["y0"]) / 640
+            for class_id, (x_center, y_center, width, height) in zip(
+                self.current_detections.class_id.tolist(),
+                self.current_detections.normalized_xywh().tolist(),
+            ):
                 f.write(
                     f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n"
                 )
@@ -0,0 +1,217 @@
+"""
+Background image writer for screenshots and annotated images.
+
+Encoding a full frame as PNG at OpenCV's default compression is one of the
+largest per-capture costs, and it used to run on the thread that took the
+capture. ImageWriterPool encodes and writes images on its own worker threads
+behind a bounded queue: ``submit`` only blocks when the queue is full, which
+keeps memory bounded when the disk cannot keep up.
+
+ImageEncoding picks the format: PNG at a given compression level (0-9,
+lossless; low levels are much faster for a small size cost), lossless WebP,
+or JPEG at a given quality. Each caller counts its own images in a
+WriteStats (encode time, bytes written) and can wait for just its images
+with ``WriteStats.wait``; ``flush_image_writers`` drains every pool, e.g.
+on logout.
+"""
+
+import os
+import queue
+import threading
+import time
+import weakref
+
+import cv2
+
+IMAGE_FORMATS = ("png", "webp", "jpeg")
+
+_STOP = object()
+_pools = weakref.WeakSet()
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+class ImageEncoding:
+    """
+    Output format of written images.
+
+    - ``format``: "png", "webp" (always lossless) or "jpeg"
+    - ``png_compression``: zlib level 0 (store) to 9 (smallest, slowest)
+    - ``jpeg_quality``: 0-100
+    """
+
+    def __init__(self, format="png", png_compression=1, jpeg_quality=95):
+        if format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unknown image format: {format} (expected one of {IMAGE_FORMATS})"
+            )
+        self.format = format
+        self.png_compression = png_compression
+        self.jpeg_quality = jpeg_quality
+
+    @property
+    def extension(self):
+        return ".jpg" if self.format == "jpeg" else f".{self.format}"
+
+    def params(self):
+        """``cv2.imencode`` parameters for this encoding."""
+        if self.format == "png":
+            return [cv2.IMWRITE_PNG_COMPRESSION, int(self.png_compression)]
+        if self.format == "webp":
+            # Quality above 100 selects lossless WebP
+            return [cv2.IMWRITE_WEBP_QUALITY, 101]
+        return [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
+
+    def encode(self, image):
+        ok, buffer = cv2.imencode(self.extension, image, self.params())
+        if not ok:
+            raise ValueError(f"Could not encode image as {self.format}")
+        return buffer
+
+    def __repr__(self):
+        if self.format == "png":
+            return f"png (level {self.png_compression})"
+        if self.format == "jpeg":
+            return f"jpeg (quality {self.jpeg_quality})"
+        return "webp (lossless)"
+
+
+class WriteStats:
+    """Counters of the images one caller submitted; safe across threads."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.pending = 0
+        self.written = 0
+        self.failed = 0
+        self.bytes = 0
+        self.encode_time = 0.0
+        self.write_time = 0.0
+
+    def _submitted(self):
+        with self._cond:
+            self.pending += 1
+
+    def _done(self, size=0, encode_time=0.0, write_time=0.0, failed=False):
+        with self._cond:
+            self.pending -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.written += 1
+                self.bytes += size
+                self.encode_time += encode_time
+                self.write_time += write_time
+            if not self.pending:
+                self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until every submitted image is on disk. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.pending, timeout)
+
+    def summary(self):
+        with self._cond:
+            written = self.written
+            return {
+                "written": written,
+                "pending": self.pending,
+                "failed": self.failed,
+                "bytes": self.bytes,
+                "avg_bytes": self.bytes / written if written else 0,
+                "avg_encode_ms": 1000 * self.encode_time / written if written else 0,
+                "avg_write_ms": 1000 * self.write_time / written if written else 0,
+            }
+
+
+def format_write_stats(stats):
+    """One-line summary of ``WriteStats.summary()``."""
+    return (
+        f"{stats['written']} images, {stats['bytes'] / 1e6:.1f} MB "
+        f"(avg {stats['avg_bytes'] / 1e3:.0f} kB), "
+        f"encode {stats['avg_encode_ms']:.1f} ms, "
+        f"write {stats['avg_write_ms']:.1f} ms per image, "
+        f"failed {stats['failed']}"
+    )
+
+
+class ImageWriterPool:
+    """
+    Worker threads that encode and write the queued images.
+
+    The caller must not modify an image after submitting it.
+    """
+
+    def __init__(self, workers=2, queue_size=16):
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._workers = [
+            threading.Thread(
+                target=self._worker_loop, name=f"image-writer-{i}", daemon=True
+            )
+            for i in range(max(1, workers))
+        ]
+        self.stats = WriteStats()
+        for worker in self._workers:
+            worker.start()
+        _pools.add(self)
+
+    def submit(self, path, image, encoding=None, stats=None):
+        """Queue ``image`` to be written to ``path``; blocks while the queue is full."""
+        encoding = encoding or ImageEncoding()
+        for counter in (self.stats, stats):
+            if counter is not None:
+                counter._submitted()
+        self._jobs.put((path, image, encoding, stats))
+
+    def flush(self, timeout=None):
+        """Wait until every queued image is written."""
+        return self.stats.wait(timeout)
+
+    def close(self):
+        """Write the queued images, then stop the workers."""
+        alive = [worker for worker in self._workers if worker.is_alive()]
+        for _ in alive:
+            self._jobs.put(_STOP)
+        for worker in alive:
+            worker.join()
+        _pools.discard(self)
+
+    def _worker_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                break
+            path, image, encoding, stats = job
+            result = {"failed": True}
+            try:
+                start = time.perf_counter()
+                buffer = encoding.encode(image)
+                encoded = time.perf_counter()
+                # tofile also handles non-ASCII paths on Windows
+                buffer.tofile(path)
+                result = {
+                    "size": buffer.nbytes,
+                    "encode_time": encoded - start,
+                    "write_time": time.perf_counter() - encoded,
+                }
+            except Exception as e:
+                print(f"[ERROR] Gagal menyimpan gambar {path}: {e}")
+            for counter in (self.stats, stats):
+                if counter is not None:
+                    counter._done(**result)
+
+
+def shared_writer():
+    """The process-wide ImageWriterPool, created on first use."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ImageWriterPool(
+                workers=min(4, os.cpu_count() or 1), queue_size=16
+            )
+        return _shared_pool
+
+
+def flush_image_writers(timeout=None):
+    """Wait for every pool's queued images (stop, logout, shutdown)."""
+    return all([pool.flush(timeout) for pool in list(_pools)])
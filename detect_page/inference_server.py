@@ -0,0 +1,375 @@
+"""
+Optional local inference server shared by the GUI pages and batch tools.
+
+Without a server every process loads its own copy of the YOLO weights.
+With ``INFERENCE_SERVER=host:port`` in .env, ``engine.load_models`` and
+``resources.model_future`` return RemoteModel clients instead. Each model
+is loaded once in the server process, and a crash or OOM in torch only takes
+down the server, not the labeling UI.
+
+Requests of all clients for the same model are merged into one predict()
+call (dynamic batching): the first request opens a batch, and more requests
+join it until ``max_batch`` frames are collected or ``max_wait`` seconds
+have passed.
+
+Clients send pickled requests, so whoever passes the handshake can run code
+in the server. Both sides therefore need ``INFERENCE_AUTHKEY``, a secret
+of your own, in .env; there is no default key and the server refuses to
+start without one.
+
+    python -m detect_page.inference_server --address localhost:6007
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from dotenv import load_dotenv
+
+DEFAULT_ADDRESS = "localhost:6007"
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    return (host or "localhost", int(port))
+
+
+def server_authkey():
+    """INFERENCE_AUTHKEY from .env as bytes; raises ValueError when unset."""
+    load_dotenv()
+    authkey = os.getenv("INFERENCE_AUTHKEY")
+    if not authkey:
+        raise ValueError("INFERENCE_AUTHKEY tidak ditemukan di file .env")
+    return authkey.encode()
+
+
+def server_address():
+    """``(address, authkey)`` from INFERENCE_SERVER in .env, or None when unset.
+
+    Raises ValueError when INFERENCE_SERVER is set without INFERENCE_AUTHKEY.
+    """
+    load_dotenv()
+    value = os.getenv("INFERENCE_SERVER")
+    if not value:
+        return None
+    return parse_address(value), server_authkey()
+
+
+def pack_result(result):
+    """Plain arrays of an ultralytics result, cheap to pickle."""
+    boxes = result.boxes
+    return (
+        boxes.xyxy.cpu().numpy().reshape(-1, 4),
+        boxes.conf.cpu().numpy().reshape(-1),
+        boxes.cls.cpu().numpy().reshape(-1),
+        dict(result.speed),
+    )
+
+
+class RemoteBox:
+    """One box with the indexing of ``ultralytics`` boxes (``box.conf[0]``)."""
+
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+
+class RemoteBoxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __iter__(self):
+        for i in range(len(self.conf)):
+            yield RemoteBox(
+                self.xyxy[i : i + 1], self.conf[i : i + 1], self.cls[i : i + 1]
+            )
+
+
+class RemoteResult:
+    def __init__(self, xyxy, conf, cls, speed):
+        self.boxes = RemoteBoxes(xyxy, conf, cls)
+        self.speed = speed
+
+
+class RemoteModel:
+    """
+    Client stand-in for a YOLO model loaded in the inference server.
+
+    ``spec`` is ``(weights_file, backend, device, int8)``. ``predict()``
+    returns results with ``boxes`` and ``speed`` like ultralytics does.
+    A lost connection is retried once (the server may have been restarted),
+    then ConnectionError is raised.
+    """
+
+    def __init__(self, spec, address, authkey):
+        self.spec = tuple(spec)
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+        self._lock = threading.Lock()
+        self.names = self._call(("load", self.spec))
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+    def _call(self, message):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._conn is None:
+                        self._conn = Client(self.address, authkey=self.authkey)
+                    self._conn.send(message)
+                    status, payload = self._conn.recv()
+                    break
+                except (EOFError, OSError) as e:
+                    self._close()
+                    if attempt:
+                        raise ConnectionError(
+                            f"Inference server at {self.address} unavailable: {e}"
+                        ) from e
+        if status != "ok":
+            raise RuntimeError(payload)
+        return payload
+
+    def predict(self, source, verbose=False, **options):
+        frames = list(source) if isinstance(source, (list, tuple)) else [source]
+        packed = self._call(("predict", self.spec, frames, options))
+        return [RemoteResult(*result) for result in packed]
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class _Request:
+    __slots__ = ("frames", "options", "future")
+
+    def __init__(self, frames, options):
+        self.frames = frames
+        self.options = options
+        self.future = Future()
+
+
+class ModelBatcher:
+    """Merges concurrent predict requests for one model into batches."""
+
+    def __init__(self, model, max_batch=16, max_wait=0.005):
+        self.model = model
+        self.names = model.names
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.frames = 0
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._loop, name="inference-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, frames, options):
+        request = _Request(frames, options)
+        self._requests.put(request)
+        return request.future
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch": self.frames / self.batches if self.batches else 0.0,
+        }
+
+    def _loop(self):
+        while True:
+            pending = [self._requests.get()]
+            count = len(pending[0].frames)
+            deadline = time.time() + self.max_wait
+            while count < self.max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                count += len(request.frames)
+
+            # predict() options (imgsz, conf, ...) apply to the whole call
+            groups = {}
+            for request in pending:
+                key = tuple(sorted(request.options.items()))
+                groups.setdefault(key, []).append(request)
+            for requests in groups.values():
+                self._run(requests)
+
+    def _run(self, requests):
+        frames = [frame for request in requests for frame in request.frames]
+        try:
+            results = self.model.predict(frames, verbose=False, **requests[0].options)
+            packed = [pack_result(result) for result in results]
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        self.batches += 1
+        self.frames += len(frames)
+        offset = 0
+        for request in requests:
+            count = len(request.frames)
+            request.future.set_result(packed[offset : offset + count])
+            offset += count
+
+
+class InferenceServer:
+    """Loads each requested model once and serves predict requests to clients."""
+
+    def __init__(self, address, authkey, max_batch=16, max_wait=0.005):
+        if not authkey:
+            raise ValueError("The inference server needs an authkey")
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.authkey = authkey
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def batcher(self, spec):
+        """Return the batcher of ``spec``, loading its model on first use."""
+        spec = tuple(spec)
+        with self._lock:
+            batcher = self._batchers.get(spec)
+            if batcher is None:
+                from detect_page.backends import load_model
+                from detect_page.engine import resolve_device, weights_path
+
+                weights_file, backend, device, int8 = spec
+                device = resolve_device(device)
+                print(f"[INFO] Loading {weights_file} ({backend}) on {device}")
+                model = load_model(weights_path(weights_file), backend, device, int8)
+                batcher = ModelBatcher(model, self.max_batch, self.max_wait)
+                self._batchers[spec] = batcher
+            return batcher
+
+    def stats(self):
+        with self._lock:
+            return {spec[0]: batcher.stats() for spec, batcher in self._batchers.items()}
+
+    def serve_forever(self):
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"[INFO] Inference server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e:
+                    print(f"[WARNING] Rejected client: {e}")
+                    continue
+                threading.Thread(
+                    target=self._serve_client,
+                    args=(conn,),
+                    name="inference-client",
+                    daemon=True,
+                ).start()
+
+    def _serve_client(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ("ok", self._handle(message))
+                except Exception as e:
+                    reply = ("error", f"{type(e).__name__}: {e}")
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+    def _handle(self, message):
+        command = message[0]
+        if command == "load":
+            return self.batcher(message[1]).names
+        if command == "predict":
+            _, spec, frames, options = message
+            return self.batcher(spec).submit(frames, options).result()
+        if command == "stats":
+            return self.stats()
+        raise ValueError(f"Unknown command: {command}")
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        description="Serve the YOLO models to the GUI and batch tools."
+    )
+    parser.add_argument(
+        "--address",
+        default=os.getenv("INFERENCE_SERVER", DEFAULT_ADDRESS),
+        help="host:port to listen on (default: INFERENCE_SERVER or %(default)s)",
+    )
+    parser.add_argument(
+        "--max-batch", type=int, default=16, help="Frames per merged predict() call"
+    )
+    parser.add_argument(
+        "--max-wait",
+        type=float,
+        default=0.005,
+        help="Seconds a batch waits for more requests",
+    )
+    parser.add_argument(
+        "--preload",
+        nargs="*",
+        default=[],
+        metavar="PROFILE",
+        help="Load the models of these detection profiles at start-up",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        authkey = server_authkey()
+    except ValueError as e:
+        print(f"[ERROR] {e}; set it to a long random secret, e.g. from")
+        print('  python -c "import secrets; print(secrets.token_hex(32))"')
+        return 1
+
+    from detect_page.engine import PROFILES
+
+    server = InferenceServer(args.address, authkey, args.max_batch, args.max_wait)
+    for name in args.preload:
+        profile = PROFILES[name]
+        for weights_file in (profile.anomaly_weights, profile.defect_weights):
+            server.batcher((weights_file, profile.backend, profile.device, profile.int8))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    for name, stats in server.stats().items():
+        print(
+            f"[INFO] {name}: {stats['frames']} frames in {stats['batches']} batches "
+            f"(avg {stats['avg_batch']:.1f})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
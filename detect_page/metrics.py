@@ -0,0 +1,67 @@
+"""
+Thread-safe per-stage timing counters for the detection pipeline.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimings:
+    """Accumulates total time and item count per named stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._counts = {}
+
+    def add(self, stage, seconds, count=1):
+        with self._lock:
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+            self._counts[stage] = self._counts.get(stage, 0) + count
+
+    @contextmanager
+    def time(self, stage, count=1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, count)
+
+    def snapshot(self):
+        """Return {stage: {"count", "total_ms", "avg_ms"}} (picklable)."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": self._counts[stage],
+                    "total_ms": total * 1000,
+                    "avg_ms": total * 1000 / self._counts[stage]
+                    if self._counts[stage]
+                    else 0.0,
+                }
+                for stage, total in self._totals.items()
+            }
+
+
+def merge_timings(snapshots):
+    """Combine several ``StageTimings.snapshot()`` dicts into one."""
+    merged = {}
+    for snapshot in snapshots:
+        for stage, values in snapshot.items():
+            entry = merged.setdefault(stage, {"count": 0, "total_ms": 0.0})
+            entry["count"] += values["count"]
+            entry["total_ms"] += values["total_ms"]
+    for entry in merged.values():
+        entry["avg_ms"] = entry["total_ms"] / entry["count"] if entry["count"] else 0.0
+    return merged
+
+
+def format_timings(snapshot, indent="  "):
+    """Render a timings snapshot as aligned text lines."""
+    lines = []
+    for stage, values in snapshot.items():
+        lines.append(
+            f"{indent}{stage:<10} {values['count']:>7} x {values['avg_ms']:8.2f} ms"
+            f"  total {values['total_ms'] / 1000:8.2f} s"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,81 @@
+"""
+Strip (conveyor) speed estimation from consecutive frames.
+
+Phase correlation on a downscaled grayscale copy of the frame measures how
+far the strip moved between two processed frames. The result does not
+depend on how many frames the machine manages to process or on how fast the
+line runs. detect_page.capture_policy.SegmentCapturePolicy uses the
+accumulated travel to capture every strip segment once.
+"""
+
+import cv2
+import numpy as np
+
+
+class StripSpeedEstimator:
+    """
+    Measures strip displacement (native pixels) and speed (pixels/second).
+
+    ``axis`` is the direction the strip moves in the image ("x" or "y").
+    When phase correlation is unreliable (weak peak on a featureless strip,
+    or a shift so large after a gap between processed frames that it may
+    alias) the smoothed speed is used instead.
+    """
+
+    def __init__(self, scale=0.25, axis="x", smoothing=0.3, min_response=0.05):
+        self.scale = scale
+        self.axis = axis
+        self.smoothing = smoothing
+        self.min_response = min_response
+        self.reset()
+
+    def reset(self):
+        self.speed = None
+        self._previous = None
+        self._previous_elapsed = None
+        self._window = None
+
+    def _prepare(self, frame):
+        small = cv2.resize(
+            frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA
+        )
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return np.float32(small)
+
+    def update(self, frame, elapsed):
+        """
+        Add a frame shown at ``elapsed`` seconds of video time.
+
+        Returns the displacement along ``axis`` since the previous frame in
+        native pixels (0.0 for the first frame).
+        """
+        current = self._prepare(frame)
+        previous, previous_elapsed = self._previous, self._previous_elapsed
+        self._previous, self._previous_elapsed = current, elapsed
+        if previous is None or previous.shape != current.shape:
+            return 0.0
+        dt = elapsed - previous_elapsed
+        if dt <= 0:
+            return 0.0
+
+        if self._window is None or self._window.shape != current.shape:
+            self._window = cv2.createHanningWindow(
+                (current.shape[1], current.shape[0]), cv2.CV_32F
+            )
+        (dx, dy), response = cv2.phaseCorrelate(previous, current, self._window)
+        shift = dx if self.axis == "x" else dy
+        extent = current.shape[1] if self.axis == "x" else current.shape[0]
+        # Shifts near half the image alias; trust the running speed instead
+        reliable = response >= self.min_response and abs(shift) < 0.4 * extent
+        shift /= self.scale
+
+        if not reliable:
+            return abs(self.speed * dt) if self.speed is not None else 0.0
+
+        speed = shift / dt
+        if self.speed is None:
+            self.speed = speed
+        else:
+            self.speed += self.smoothing * (speed - self.speed)
+        return abs(shift)
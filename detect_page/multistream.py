@@ -0,0 +1,368 @@
+"""
+Multi-stream detection: several cameras or video files, one model instance
+per model type.
+
+Every stream gets its own DetectionEngine (decoder, gate, tracker, capture
+policy, defect queue and output files), started with ``shared_inference``.
+A single inference thread then builds anomaly batches from the streams'
+decoded frames:
+
+- ``round-robin``: take one frame per stream in turn
+- ``deadline``: take the frames that were decoded earliest first, so the
+  stream that is furthest behind is served first
+
+Defect model calls of all streams are serialized on one lock. Each stream
+writes its own history and annotation CSVs, and its screenshots go to
+``screenshots/<stream>/``, so its DB rows are kept apart through
+``image_path``.
+
+    python -m detect_page.multistream top=0 bottom=1 edge=recordings/edge.mp4
+"""
+
+import argparse
+import copy
+import sys
+import threading
+import time
+import traceback
+from functools import partial
+
+from detect_page.engine import (
+    PROFILES,
+    DetectionEngine,
+    create_db_engine,
+    create_tiler,
+    load_models,
+)
+from detect_page.metrics import StageTimings
+from detect_page.pipeline import _STOP, MAX_BATCH_ERRORS, YOLO_INPUT_SIZE, infer_frames
+from detect_page.scheduler import SCHEDULE_POLICIES
+
+STREAM_POLICIES = ("round-robin", "deadline")
+
+
+class StreamScheduler:
+    """Chooses the stream whose waiting frame goes into the batch next."""
+
+    def __init__(self, policy="round-robin"):
+        if policy not in STREAM_POLICIES:
+            raise ValueError(f"Unknown stream policy: {policy}")
+        self.policy = policy
+        self._next = 0
+
+    def pick(self, candidates, stream_count):
+        """``candidates`` are (stream index, packet) pairs; returns one of them."""
+        if self.policy == "deadline":
+            return min(candidates, key=lambda c: c[1]["decoded_at"])
+        choice = min(candidates, key=lambda c: (c[0] - self._next) % stream_count)
+        self._next = (choice[0] + 1) % stream_count
+        return choice
+
+
+class MultiStreamEngine:
+    """
+    Runs one profile over several sources with shared models.
+
+    Callbacks are invoked from worker threads:
+
+    - ``on_frame(packet)`` per processed frame; ``packet["stream"]`` names
+      the stream
+    - ``on_stream_finished(name)`` when one source reaches its end
+    - ``on_finished()`` once every source has ended
+    - ``on_error(error)`` once when inference gave up after
+      ``MAX_BATCH_ERRORS`` failed batches in a row or a lost inference
+      server connection (``on_finished`` without
+      it); the streams must still be stopped
+    """
+
+    def __init__(
+        self,
+        profile,
+        anomaly_model,
+        defect_model,
+        on_frame,
+        on_finished=None,
+        on_error=None,
+        on_stream_finished=None,
+        on_capture_done=None,
+        db_engine=None,
+        stream_policy="round-robin",
+    ):
+        self.profile = profile
+        self.anomaly_model = anomaly_model
+        self.defect_model = defect_model
+        self.on_frame = on_frame
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.on_stream_finished = on_stream_finished
+        self.on_capture_done = on_capture_done
+        self.db_engine = db_engine
+        self.stream_scheduler = StreamScheduler(stream_policy)
+
+        self.engines = {}
+        self.conf_threshold = 0.0
+        self.timings = StageTimings()
+        self._model_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._inference = None
+
+    @property
+    def is_running(self):
+        return self._inference is not None
+
+    def start(
+        self,
+        sources,
+        conf_threshold=0.0,
+        display_size=(YOLO_INPUT_SIZE, YOLO_INPUT_SIZE),
+        schedule_policy=None,
+        render=True,
+    ):
+        """Start every stream; ``sources`` maps stream names to files or camera indices."""
+        if self.is_running:
+            self.stop()
+        self.conf_threshold = conf_threshold
+        self.timings = StageTimings()
+        self._stop_event.clear()
+        self.engines = {}
+        for name, source in sources.items():
+            engine = DetectionEngine(
+                self.profile,
+                self.anomaly_model,
+                self.defect_model,
+                on_frame=partial(self._stream_frame, name),
+                on_finished=partial(self._stream_finished, name),
+                on_capture_done=self.on_capture_done,
+                db_engine=self.db_engine,
+                model_lock=self._model_lock,
+            )
+            engine.start(
+                source,
+                conf_threshold=conf_threshold,
+                display_size=display_size,
+                schedule_policy=schedule_policy,
+                render=render,
+                run_name=name,
+                shared_inference=True,
+            )
+            self.engines[name] = engine
+
+        self._inference = threading.Thread(
+            target=self._inference_loop, name="multistream-inference", daemon=True
+        )
+        self._inference.start()
+
+    def stop(self):
+        """Stop all streams; returns ``stats()`` of the finished run."""
+        if self._inference is None:
+            return self.stats()
+        self._stop_event.set()
+        if self._inference is not threading.current_thread():
+            self._inference.join()
+        self._inference = None
+        for engine in self.engines.values():
+            engine.stop()
+        return self.stats()
+
+    def pause(self):
+        for engine in self.engines.values():
+            engine.pause()
+
+    def resume(self):
+        for engine in self.engines.values():
+            engine.resume()
+
+    def set_conf_threshold(self, conf_threshold):
+        self.conf_threshold = conf_threshold
+        for engine in self.engines.values():
+            engine.set_conf_threshold(conf_threshold)
+
+    def stats(self):
+        """Per-stream scheduler summaries (FPS, latency, drops)."""
+        return {
+            name: (
+                engine.pipeline.scheduler.summary()
+                if engine.pipeline is not None
+                else engine.last_run_stats
+            )
+            for name, engine in self.engines.items()
+        }
+
+    def _stream_frame(self, name, packet):
+        packet["stream"] = name
+        self.on_frame(packet)
+
+    def _stream_finished(self, name):
+        if self.on_stream_finished:
+            self.on_stream_finished(name)
+
+    def _collect_batch(self, pipelines, heads, active):
+        """Fill a batch from the streams' waiting frames in scheduler order."""
+        batch_size = max(self.profile.batch_size, len(pipelines))
+        batch = []
+        deadline = None
+        while len(batch) < batch_size and not self._stop_event.is_set():
+            for index in list(active):
+                if heads[index] is None:
+                    packet = pipelines[index].next_packet()
+                    if packet is _STOP:
+                        active.discard(index)
+                        pipelines[index].notify_finished()
+                    else:
+                        heads[index] = packet
+            candidates = [(i, heads[i]) for i in active if heads[i] is not None]
+            if not candidates:
+                if not active or (deadline is not None and time.time() >= deadline):
+                    break
+                time.sleep(0.002)
+                continue
+            index, packet = self.stream_scheduler.pick(candidates, len(pipelines))
+            heads[index] = None
+            batch.append((index, packet))
+            if deadline is None:
+                deadline = time.time() + self.profile.max_batch_latency
+        return batch
+
+    def _process_batch(self, pipelines, tiler, batch):
+        per_stream = {}
+        for index, packet in batch:
+            per_stream.setdefault(index, []).append(packet)
+        prepared = []
+        infer = []
+        for index, packets in per_stream.items():
+            kept, to_infer = pipelines[index].prepare_batch(packets)
+            prepared.append((index, kept, len(to_infer)))
+            infer.extend(to_infer)
+
+        outputs = []
+        if infer:
+            with self.timings.time("anomaly", count=len(infer)):
+                outputs = infer_frames(
+                    self.anomaly_model,
+                    [packet["frame"] for packet in infer],
+                    self.conf_threshold,
+                    tiler,
+                )
+        offset = 0
+        for index, kept, count in prepared:
+            pipelines[index].finish_batch(kept, outputs[offset : offset + count])
+            offset += count
+
+    def _inference_loop(self):
+        pipelines = [engine.pipeline for engine in self.engines.values()]
+        tiler = create_tiler(self.profile)
+        heads = [None] * len(pipelines)
+        active = set(range(len(pipelines)))
+        failures = 0
+
+        while active and not self._stop_event.is_set():
+            batch = self._collect_batch(pipelines, heads, active)
+            if not batch:
+                continue
+            try:
+                self._process_batch(pipelines, tiler, batch)
+            except Exception as e:
+                print(f"[ERROR] Gagal memproses frame: {e}")
+                traceback.print_exc()
+                failures += 1
+                # A lost inference server does not come back by retrying
+                if failures >= MAX_BATCH_ERRORS or isinstance(e, ConnectionError):
+                    if self._stop_event.is_set():
+                        return
+                    if self.on_error:
+                        self.on_error(e)
+                    elif self.on_finished:
+                        self.on_finished()
+                    return
+                continue
+            failures = 0
+
+        if not active and not self._stop_event.is_set() and self.on_finished:
+            self.on_finished()
+
+
+def format_stream_stats(stats):
+    lines = []
+    for name, summary in stats.items():
+        if summary is None:
+            continue
+        lines.append(
+            f"  {name:<10} {summary['processed']:>7} frames "
+            f"{summary['processing_fps']:7.2f} FPS  "
+            f"latency avg {summary['avg_latency_ms']:7.1f} ms "
+            f"max {summary['max_latency_ms']:7.1f} ms  "
+            f"dropped {summary['dropped']} skipped {summary['skipped']}"
+        )
+    return "\n".join(lines)
+
+
+def parse_sources(values):
+    """``NAME=SOURCE`` pairs (or bare sources, named stream1..N)."""
+    sources = {}
+    for number, value in enumerate(values, start=1):
+        name, sep, source = value.partition("=")
+        if not sep:
+            name, source = f"stream{number}", value
+        sources[name] = source
+    return sources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run detection on several cameras or videos with shared models."
+    )
+    parser.add_argument(
+        "streams", nargs="+", help="NAME=SOURCE, SOURCE is a file or camera index"
+    )
+    parser.add_argument("--profile", default="gpu-s", choices=sorted(PROFILES))
+    parser.add_argument("--policy", default="round-robin", choices=STREAM_POLICIES)
+    parser.add_argument("--schedule", default="realtime", choices=SCHEDULE_POLICIES)
+    parser.add_argument(
+        "--db",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Write detections to the database from DB_URL (default: per profile)",
+    )
+    parser.add_argument(
+        "--report-every",
+        type=float,
+        default=10.0,
+        help="Seconds between per-stream statistics",
+    )
+    args = parser.parse_args(argv)
+
+    profile = copy.copy(PROFILES[args.profile])
+    if args.db is not None:
+        profile.use_database = args.db
+    anomaly_model, defect_model = load_models(profile)
+    db_engine = create_db_engine() if profile.use_database else None
+
+    finished = threading.Event()
+    engine = MultiStreamEngine(
+        profile,
+        anomaly_model,
+        defect_model,
+        on_frame=lambda packet: None,
+        on_finished=finished.set,
+        on_stream_finished=lambda name: print(f"[INFO] Stream {name} finished"),
+        db_engine=db_engine,
+        stream_policy=args.policy,
+    )
+    engine.start(
+        parse_sources(args.streams),
+        display_size=None,
+        schedule_policy=args.schedule,
+        render=False,
+    )
+    try:
+        while not finished.wait(timeout=args.report_every):
+            print(f"[INFO] Streams:\n{format_stream_stats(engine.stats())}")
+    except KeyboardInterrupt:
+        pass
+    stats = engine.stop()
+    print(f"[INFO] Final statistics:\n{format_stream_stats(stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
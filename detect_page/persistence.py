@@ -0,0 +1,214 @@
+"""
+Batched writers for detection rows and run metrics.
+
+Captures and per-frame metrics used to reopen their CSV file for every row
+and run a separate transaction per capture. BufferedCsvWriter keeps one
+file open and writes rows in batches; BatchedInserter collects database
+rows per table and writes them as multi-row ``INSERT ... VALUES`` in one
+transaction. Both flush once ``max_rows`` rows are waiting or the oldest
+one is ``max_age`` seconds old (checked on every write and by
+``flush_if_due``, which the engine also calls while no rows arrive), and
+``close`` writes what is left, for the CSV with an fsync, so a finished
+run is on disk.
+
+Both are meant for the pipeline's persistence thread, but lock their
+buffers so a shutdown flush from another thread is safe.
+"""
+
+import csv
+import os
+import threading
+import time
+
+from sqlalchemy import column, insert, table
+
+# Columns of the anomaly/defect tables; the id column is "<table>_id"
+DETECTION_COLUMNS = (
+    "class_id",
+    "image_path",
+    "xcenter",
+    "ycenter",
+    "width",
+    "height",
+    "cl",
+)
+DETECTION_TABLES = {
+    name: table(name, column(f"{name}_id"), *(column(c) for c in DETECTION_COLUMNS))
+    for name in ("anomaly", "defect")
+}
+
+
+class _FlushTrigger:
+    """Size and age limits of a row buffer."""
+
+    def __init__(self, max_rows, max_age):
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.first_row_at = None
+
+    def added(self, pending):
+        if self.first_row_at is None:
+            self.first_row_at = time.monotonic()
+        return self.due(pending)
+
+    def due(self, pending):
+        if not pending:
+            return False
+        return (
+            pending >= self.max_rows
+            or time.monotonic() - self.first_row_at >= self.max_age
+        )
+
+    def flushed(self):
+        self.first_row_at = None
+
+
+class BufferedCsvWriter:
+    """
+    Appends rows to one CSV file that stays open for the whole run.
+
+    ``header`` is written when the file is new. The file is opened on the
+    first write (or right away with ``create=True``) and reopened after
+    ``close`` when more rows arrive.
+    """
+
+    def __init__(self, path, header=None, max_rows=256, max_age=2.0, create=False):
+        self.path = path
+        self.header = header
+        self._trigger = _FlushTrigger(max_rows, max_age)
+        self._lock = threading.Lock()
+        self._rows = []
+        self._file = None
+        self._writer = None
+        self.rows_written = 0
+        if create:
+            with self._lock:
+                self._open()
+
+    def _open(self):
+        write_header = not os.path.exists(self.path) or not os.path.getsize(self.path)
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if write_header and self.header:
+            self._writer.writerow(self.header)
+            self._file.flush()
+
+    @property
+    def max_age(self):
+        return self._trigger.max_age
+
+    def write_row(self, row):
+        self.write_rows([row])
+
+    def write_rows(self, rows):
+        with self._lock:
+            self._rows.extend(rows)
+            if self._trigger.added(len(self._rows)):
+                self._flush()
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._trigger.due(len(self._rows)):
+                self._flush()
+
+    def flush(self, durable=False):
+        with self._lock:
+            self._flush(durable)
+
+    def close(self):
+        """Write the buffered rows, fsync and close the file."""
+        with self._lock:
+            self._flush(durable=True)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._writer = None
+
+    def _flush(self, durable=False):
+        if self._rows:
+            if self._file is None:
+                self._open()
+            self._writer.writerows(self._rows)
+            self.rows_written += len(self._rows)
+            self._rows = []
+        self._trigger.flushed()
+        if self._file is not None:
+            self._file.flush()
+            if durable:
+                os.fsync(self._file.fileno())
+
+
+class BatchedInserter:
+    """
+    Collects rows per table and inserts them together.
+
+    Each flush is one transaction with one multi-row INSERT per table (and
+    per ``chunk_size`` rows). Rows of a failed flush are reported and
+    dropped, so a database outage cannot grow the buffer without bound.
+    """
+
+    def __init__(self, db_engine, max_rows=500, max_age=2.0, chunk_size=1000):
+        self.db_engine = db_engine
+        self.chunk_size = chunk_size
+        self._trigger = _FlushTrigger(max_rows, max_age)
+        self._lock = threading.Lock()
+        self._rows = {}  # Table -> list of row dicts
+        self._pending = 0
+        self.rows_written = 0
+        self.batches = 0
+        self.failed_rows = 0
+
+    @property
+    def max_age(self):
+        return self._trigger.max_age
+
+    def add(self, target, rows):
+        """Queue ``rows`` (dicts by column name) for ``target`` (a sqlalchemy table)."""
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock:
+            self._rows.setdefault(target, []).extend(rows)
+            self._pending += len(rows)
+            if self._trigger.added(self._pending):
+                self._flush()
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._trigger.due(self._pending):
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            self._trigger.flushed()
+            return
+        batches, pending = self._rows, self._pending
+        self._rows, self._pending = {}, 0
+        self._trigger.flushed()
+        try:
+            with self.db_engine.begin() as conn:
+                for target, rows in batches.items():
+                    for start in range(0, len(rows), self.chunk_size):
+                        conn.execute(
+                            insert(target).values(rows[start : start + self.chunk_size])
+                        )
+        except Exception as e:
+            self.failed_rows += pending
+            print(f"[ERROR] Gagal menyimpan {pending} deteksi ke database: {e}")
+            return
+        self.rows_written += pending
+        self.batches += 1
+        print(f"[INFO] {pending} deteksi disimpan ke database")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "rows_written": self.rows_written,
+                "batches": self.batches,
+                "failed_rows": self.failed_rows,
+            }
@@ -0,0 +1,586 @@
+"""
+Threaded decode / inference / persistence pipeline for video detection.
+
+Each stage runs on its own worker thread and the stages are connected by
+bounded queues, so a slow model call never blocks the GUI thread. Finished
+frames are handed back through the ``on_frame`` callback, which the widgets
+bridge onto a Qt signal. This module does not import Qt.
+"""
+
+import queue
+import threading
+import time
+import traceback
+
+import cv2
+import numpy as np
+
+from detect_page.detections import YOLO_INPUT_SIZE, DetectionBatch
+from detect_page.metrics import StageTimings
+from detect_page.scheduler import FrameScheduler
+
+ANOMALY_COLOR = (0, 255, 0)
+# Consecutive failed batches after which the inference stage gives up
+MAX_BATCH_ERRORS = 3
+
+_STOP = object()
+
+
+def extract_detections(result, names, conf_threshold=0.0):
+    """Columns (DetectionBatch) of one YOLO result, as carried by the packets."""
+    return DetectionBatch.from_result(result, names, conf_threshold)
+
+
+def nms_detections(detections, iou_threshold=0.5, metric="iou"):
+    """
+    Class-wise greedy NMS over a DetectionBatch, highest confidence first.
+
+    ``metric="ios"`` divides the overlap by the smaller box instead of the
+    union, which also removes partial boxes cut off at tile borders.
+    """
+    if len(detections) < 2:
+        return detections
+    boxes = detections.boxes.astype(float)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    for class_id in np.unique(detections.class_id):
+        group = np.flatnonzero(detections.class_id == class_id)
+        group = group[np.argsort(-detections.confidence[group], kind="stable")]
+        suppressed = np.zeros(len(group), dtype=bool)
+        for i in range(len(group)):
+            if suppressed[i]:
+                continue
+            keep.append(group[i])
+            rest = np.arange(i + 1, len(group))
+            rest = rest[~suppressed[rest]]
+            if not len(rest):
+                break
+            best, others = boxes[group[i]], boxes[group[rest]]
+            w = np.clip(
+                np.minimum(best[2], others[:, 2]) - np.maximum(best[0], others[:, 0]),
+                0,
+                None,
+            )
+            h = np.clip(
+                np.minimum(best[3], others[:, 3]) - np.maximum(best[1], others[:, 1]),
+                0,
+                None,
+            )
+            inter = w * h
+            if metric == "ios":
+                denom = np.minimum(areas[group[i]], areas[group[rest]])
+            else:
+                denom = areas[group[i]] + areas[group[rest]] - inter
+            overlap = inter / np.maximum(denom, 1e-9)
+            suppressed[rest[overlap > iou_threshold]] = True
+    return detections.select(np.array(keep, dtype=np.intp))
+
+
+def draw_detections(frame, detections, scale_x, scale_y, color=ANOMALY_COLOR):
+    """Draw detection boxes (in 640x640 model space) onto ``frame`` in place.
+
+    ``detections`` is a DetectionBatch (detection dicts are converted).
+    """
+    batch = DetectionBatch.coerce(detections)
+    for (x0, y0, x1, y1), class_name, confidence in zip(
+        batch.scaled(scale_x, scale_y).tolist(),
+        batch.labels.tolist(),
+        batch.confidence.tolist(),
+    ):
+        cv2.rectangle(frame, (x0, y0), (x1, y1), color, 2)
+        label = f"{class_name} {confidence:.1f}%"
+        cv2.putText(
+            frame,
+            label,
+            (x0, max(y0 - 10, 0)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            color,
+            2,
+            cv2.LINE_AA,
+        )
+
+
+def predict_batched(model, frames):
+    """Run ``frames`` through ``model`` in one call; results keep the input order."""
+    if not frames:
+        return []
+    return model.predict(list(frames), verbose=False)
+
+
+def infer_frames(model, frames, conf_threshold=0.0, tiler=None):
+    """Run the anomaly model on native frames.
+
+    Returns ``[(detections, total_time_ms)]`` per frame, either from the
+    frames resized to 640x640 or, with a ``tiler``, from native tiles.
+    """
+    if not frames:
+        return []
+    if tiler is not None:
+        return tiler.predict(model, frames, conf_threshold)
+    frames_yolo = [
+        cv2.resize(frame, (YOLO_INPUT_SIZE, YOLO_INPUT_SIZE)) for frame in frames
+    ]
+    return [
+        (
+            extract_detections(result, model.names, conf_threshold),
+            result_total_time(result),
+        )
+        for result in predict_batched(model, frames_yolo)
+    ]
+
+
+def result_total_time(result):
+    """Return preprocess + inference + postprocess time in ms, or None."""
+    if result is None or not hasattr(result, "speed"):
+        return None
+    speed = result.speed
+    return speed["preprocess"] + speed["inference"] + speed["postprocess"]
+
+
+class DetectionPipeline:
+    """
+    Runs decode, anomaly inference and persistence on separate threads.
+
+    Callbacks are invoked from worker threads:
+
+    - ``on_frame(packet)`` for every finished frame, in decode order
+    - ``on_finished()`` once when the video reaches its end
+    - ``on_error(error)`` once when inference gave up, after
+      ``MAX_BATCH_ERRORS`` failed batches in a row or right away when the
+      inference server connection was lost; the run has ended and
+      must still be stopped (without ``on_error``, ``on_finished`` is
+      called instead)
+    - ``on_job_done(result)`` for every persistence job that returns a value
+    - ``on_idle()`` on the persistence thread when no job arrived for
+      ``idle_interval`` seconds, e.g. to write out buffered rows while the
+      video is paused
+
+    With ``batch_size > 1`` the inference stage collects up to that many
+    decoded frames, waiting at most ``max_batch_latency`` seconds after the
+    first one, and runs them through the model in a single call.
+
+    ``scheduler`` (a FrameScheduler, realtime by default) decides whether the
+    decoder follows the video clock, how it catches up and which frames are
+    too old to be worth inferring.
+
+    With a ``gate`` (detect_page.gating.FrameGate), frames that hardly differ
+    from the last inferred one skip the model and reuse its detections; such
+    packets carry ``gated=True``. With a ``tiler`` (detect_page.tiling.Tiler)
+    the model sees overlapping native-resolution tiles instead of the whole
+    frame squeezed to 640x640.
+
+    With ``decode_process=True`` frames are decoded by a child process and
+    handed over through shared memory (detect_page.frame_ring.DecoderProcess),
+    so cv2 decoding does not compete with inference for the GIL.
+
+    With a ``frame_buffer`` (detect_page.frame_buffer.FrameBuffer) every
+    decoded frame is also kept there by index, so captures can reach back to
+    recent native frames.
+
+    ``display_size=None`` keeps frames at their native size. With
+    ``render=False`` no annotated display frame is drawn (headless runs);
+    ``display_frame`` is then None and only ``clean_frame`` is set. With
+    ``overlay=True`` the boxes are not drawn in; ``display_frame`` is the
+    clean frame itself and the front-end paints the overlay
+    (detect_page.frame_view).
+    Stage times are accumulated in ``timings``.
+    """
+
+    def __init__(
+        self,
+        video_path,
+        model,
+        on_frame,
+        on_finished=None,
+        on_error=None,
+        on_job_done=None,
+        on_idle=None,
+        idle_interval=2.0,
+        conf_threshold=0.0,
+        display_size=(YOLO_INPUT_SIZE, YOLO_INPUT_SIZE),
+        frame_queue_size=4,
+        job_queue_size=64,
+        batch_size=1,
+        max_batch_latency=0.05,
+        scheduler=None,
+        render=True,
+        overlay=False,
+        timings=None,
+        gate=None,
+        tiler=None,
+        decode_process=False,
+        frame_buffer=None,
+    ):
+        self.video_path = video_path
+        self.model = model
+        self.on_frame = on_frame
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.on_job_done = on_job_done
+        self.on_idle = on_idle
+        self.idle_interval = idle_interval
+        # Both may be changed from the GUI thread while the pipeline runs
+        self.conf_threshold = conf_threshold
+        self.display_size = display_size
+        self.batch_size = max(1, batch_size)
+        self.max_batch_latency = max_batch_latency
+        self.scheduler = scheduler or FrameScheduler()
+        self.render = render
+        self.overlay = overlay
+        self.timings = timings or StageTimings()
+        self.gate = gate
+        self.tiler = tiler
+        self.decode_process = decode_process
+        self.frame_buffer = frame_buffer
+        self._last_detections = DetectionBatch.empty()
+
+        self.video_capture = None
+        self.frame_rate = 0
+        self.frame_duration = 0
+        self.start_time = 0
+        self._paused_at = None
+
+        self._frames = queue.Queue(maxsize=max(frame_queue_size, 2 * self.batch_size))
+        self._jobs = queue.Queue(maxsize=job_queue_size)
+        self._stop_event = threading.Event()
+        self._running = threading.Event()
+        self._ended = False
+        self._decoder = None
+        self._inference = None
+        self._persistence = None
+
+    @property
+    def is_paused(self):
+        return not self._running.is_set()
+
+    def is_alive(self):
+        """True while the inference thread is still running."""
+        return self._inference is not None and self._inference.is_alive()
+
+    def start(self, run_inference=True):
+        """Open the video and start the worker threads.
+
+        With ``run_inference=False`` no inference thread is started; a shared
+        driver (detect_page.multistream) pulls packets with ``next_packet``
+        and runs ``prepare_batch``/``finish_batch`` itself. ``video_path``
+        may also be a camera index.
+        """
+        source = self.video_path
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        if self.decode_process:
+            from detect_page.frame_ring import DecoderProcess
+
+            self.video_capture = DecoderProcess(source)
+        else:
+            self.video_capture = cv2.VideoCapture(source)
+        self.frame_rate = self.video_capture.get(cv2.CAP_PROP_FPS)
+        self.frame_duration = 1.0 / self.frame_rate if self.frame_rate > 0 else 0.033
+        self.start_time = time.time()
+        self.scheduler.reset()
+        self._running.set()
+
+        self._decoder = threading.Thread(
+            target=self._decode_loop, name="detect-decoder", daemon=True
+        )
+        self._inference = None
+        if run_inference:
+            self._inference = threading.Thread(
+                target=self._inference_loop, name="detect-inference", daemon=True
+            )
+        self._persistence = threading.Thread(
+            target=self._persistence_loop, name="detect-persistence", daemon=True
+        )
+        self._decoder.start()
+        if self._inference is not None:
+            self._inference.start()
+        self._persistence.start()
+
+    def pause(self):
+        if self._running.is_set():
+            self._paused_at = time.time()
+            self._running.clear()
+
+    def resume(self):
+        if not self._running.is_set():
+            # Shift the clock so playback continues where it was paused
+            if self._paused_at is not None:
+                self.start_time += time.time() - self._paused_at
+                self._paused_at = None
+            self._running.set()
+
+    def stop_processing(self):
+        """Stop decoding and inference; persistence keeps accepting jobs."""
+        self._stop_event.set()
+        self._running.set()
+        for thread in (self._decoder, self._inference):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join()
+
+    def stop(self):
+        """Stop decoding and inference, then drain pending persistence jobs."""
+        self.stop_processing()
+        if self._persistence is not None and self._persistence.is_alive():
+            self._jobs.put(_STOP)
+            if self._persistence is not threading.current_thread():
+                self._persistence.join()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` on the persistence thread."""
+        self._jobs.put((func, args, kwargs))
+
+    def _put(self, target_queue, item):
+        """Blocking put that gives up once the pipeline is stopped."""
+        while not self._stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue):
+        """Blocking get that returns _STOP once the pipeline is stopped."""
+        while not self._stop_event.is_set():
+            try:
+                return source_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _put_latest(self, packet):
+        """Queue a packet, dropping the oldest waiting frame when the queue is full."""
+        while True:
+            try:
+                self._frames.put_nowait(packet)
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                    self.scheduler.record_dropped()
+                except queue.Empty:
+                    pass
+
+    def _decode_loop(self):
+        capture = self.video_capture
+        scheduler = self.scheduler
+        frame_index = 0
+        try:
+            while not self._stop_event.is_set():
+                if not self._running.wait(timeout=0.1):
+                    continue
+
+                elapsed_time = time.time() - self.start_time
+                wait = scheduler.wait_time(
+                    frame_index, elapsed_time, self.frame_duration
+                )
+                if wait > 0:
+                    # Ahead of the video clock: wait until this frame is due
+                    time.sleep(min(wait, self.frame_duration))
+                    continue
+
+                # Behind the video clock: skip without seeking or converting
+                skip = scheduler.frames_to_skip(
+                    frame_index, elapsed_time, self.frame_duration
+                )
+                grabbed = 0
+                while grabbed < skip and capture.grab():
+                    grabbed += 1
+                if grabbed:
+                    scheduler.record_skipped(grabbed)
+                    frame_index += grabbed
+                if grabbed < skip:
+                    self._ended = True
+                    break
+
+                with self.timings.time("decode"):
+                    ret, frame = capture.read()
+                if not ret:
+                    self._ended = True
+                    break
+                scheduler.record_decoded()
+                packet = {
+                    "index": frame_index,
+                    "elapsed": frame_index * self.frame_duration,
+                    "decoded_at": time.time(),
+                    "frame": frame,
+                }
+                if self.frame_buffer is not None:
+                    self.frame_buffer.add(frame_index, frame, packet["elapsed"])
+                frame_index += 1
+                if scheduler.keep_latest:
+                    self._put_latest(packet)
+                elif not self._put(self._frames, packet):
+                    break
+        finally:
+            capture.release()
+            self._put(self._frames, _STOP)
+
+    def _collect_batch(self):
+        """Collect up to batch_size packets; returns (batch, stream_done)."""
+        first = self._get(self._frames)
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.time() + self.max_batch_latency
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                packet = self._frames.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if packet is _STOP:
+                return batch, True
+            batch.append(packet)
+        return batch, False
+
+    def _inference_loop(self):
+        done = False
+        failures = 0
+        while not done:
+            batch, done = self._collect_batch()
+            try:
+                batch, infer = self.prepare_batch(batch)
+                outputs = []
+                if infer:
+                    with self.timings.time("anomaly", count=len(infer)):
+                        outputs = infer_frames(
+                            self.model,
+                            [packet["frame"] for packet in infer],
+                            self.conf_threshold,
+                            self.tiler,
+                        )
+                self.finish_batch(batch, outputs)
+            except ConnectionError as e:
+                # Inference server went away: end the run and tell the UI
+                print(f"[ERROR] {e}")
+                self.notify_error(e)
+                return
+            except Exception as e:
+                # The rest of the batch is lost; give up if it keeps failing
+                print(f"[ERROR] Gagal memproses frame: {e}")
+                traceback.print_exc()
+                failures += 1
+                if failures >= MAX_BATCH_ERRORS:
+                    self.notify_error(e)
+                    return
+                continue
+            failures = 0
+        self.notify_finished()
+
+    def next_packet(self):
+        """Non-blocking read of the next decoded packet (shared inference).
+
+        Returns None when nothing is waiting and _STOP once the stream ended.
+        """
+        try:
+            return self._frames.get_nowait()
+        except queue.Empty:
+            return _STOP if self._stop_event.is_set() else None
+
+    def prepare_batch(self, batch):
+        """Drop stale packets and apply the gate.
+
+        Returns ``(batch, infer)``: the packets still to be shown and those of
+        them that need the model.
+        """
+        now = time.time()
+        fresh = [p for p in batch if not self.scheduler.is_stale(p, now)]
+        if len(fresh) < len(batch):
+            self.scheduler.record_dropped(len(batch) - len(fresh))
+        if self.gate is None:
+            return fresh, fresh
+        for packet in fresh:
+            gate_start = time.perf_counter()
+            packet["gated"] = not self.gate.should_infer(packet["frame"])
+            packet["gate_time"] = (time.perf_counter() - gate_start) * 1000
+            self.timings.add("gate", packet["gate_time"] / 1000)
+        infer = [packet for packet in fresh if not packet["gated"]]
+        if len(infer) < len(fresh):
+            self.scheduler.record_gated(len(fresh) - len(infer))
+        return fresh, infer
+
+    def finish_batch(self, batch, outputs):
+        """Render and hand over a batch; ``outputs`` belong to its non-gated packets."""
+        outputs = iter(outputs)
+        for packet in batch:
+            with self.timings.time("render"):
+                if packet.get("gated"):
+                    # A gated frame only cost the gate check
+                    detections = self._last_detections.copy()
+                    packet = self._render(packet, detections, packet["gate_time"])
+                else:
+                    detections, total_time = next(outputs)
+                    self._last_detections = detections
+                    packet = self._render(packet, detections, total_time)
+            self.on_frame(packet)
+            self.scheduler.record_processed(time.time() - packet["decoded_at"])
+
+    def notify_finished(self):
+        """Call on_finished if the video ended on its own (not stopped)."""
+        if self._ended and not self._stop_event.is_set() and self.on_finished:
+            self.on_finished()
+
+    def notify_error(self, error):
+        """End the run on ``error``: call on_error (or on_finished) unless stopped."""
+        if self._stop_event.is_set():
+            return
+        if self.on_error:
+            self.on_error(error)
+        elif self.on_finished:
+            self.on_finished()
+
+    def _render(self, packet, detections, total_time):
+        """Attach detections for one frame and render its display frame."""
+        frame = packet["frame"]
+
+        if self.display_size is None:
+            height, width = frame.shape[:2]
+            frame_display_clean = frame
+        else:
+            width, height = self.display_size
+            frame_display_clean = cv2.resize(frame, (width, height))
+
+        frame_display = None
+        if self.render and self.overlay:
+            # The front-end paints the boxes over the clean frame
+            frame_display = frame_display_clean
+        elif self.render:
+            frame_display = frame_display_clean.copy()
+            draw_detections(
+                frame_display,
+                detections,
+                width / YOLO_INPUT_SIZE,
+                height / YOLO_INPUT_SIZE,
+            )
+
+        packet["detections"] = detections
+        packet["total_time"] = total_time
+        packet["display_frame"] = frame_display
+        packet["clean_frame"] = frame_display_clean
+        return packet
+
+    def _persistence_loop(self):
+        timeout = self.idle_interval if self.on_idle else None
+        while True:
+            try:
+                job = self._jobs.get(timeout=timeout)
+            except queue.Empty:
+                try:
+                    self.on_idle()
+                except Exception as e:
+                    print(f"Error saat menyimpan hasil deteksi: {e}")
+                continue
+            if job is _STOP:
+                break
+            func, args, kwargs = job
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                print(f"Error saat menyimpan hasil deteksi: {e}")
+                continue
+            if result is not None and self.on_job_done:
+                self.on_job_done(result)
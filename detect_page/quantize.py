@@ -0,0 +1,181 @@
+"""
+INT8 post-training quantization of the CPU profile's weights.
+
+Calibration uses the frames the line already produced: every image under
+``screenshots/``, plus the images reviewed in the label widget (the
+``final_defect`` table) when --db is given. One in every ``--holdout``
+images is kept out of calibration and used to measure the INT8 model against
+the FP32 PyTorch model.
+
+    python -m detect_page.quantize --profile cpu-n --db
+
+This writes ``<weights>_int8_openvino_model/`` next to each ``.pt`` file. It
+also writes the accuracy/throughput report ``<...>.parity.json``, which
+``detect_page.backends.load_model`` reads before it uses the INT8 model.
+Select the result with the ``cpu-n-int8`` profile, or with DETECT_INT8=1
+for detectcpuonly.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import yaml
+from sqlalchemy import text
+from ultralytics import YOLO
+
+from detect_page.backends import (
+    IMAGE_EXTS,
+    compare_results,
+    export_model,
+    format_report,
+    parity_report_path,
+    read_images,
+)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALIBRATION_DIR = "calibration"
+
+# INT8 may move boxes and scores slightly more than an FP32 export
+INT8_MIN_MATCH = 0.9
+INT8_MAX_CONF_DIFF = 0.1
+
+
+def screenshot_images(folder="screenshots"):
+    """All images below ``folder``, recursively."""
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(
+            os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTS)
+        )
+    return sorted(paths)
+
+
+def final_defect_images(db_engine):
+    """Images that have reviewed boxes in ``final_defect`` (paths are project-relative)."""
+    with db_engine.connect() as conn:
+        rows = conn.execute(text("SELECT DISTINCT image_path FROM final_defect"))
+        paths = [os.path.join(PROJECT_ROOT, row[0]) for row in rows]
+    return sorted(p for p in paths if os.path.exists(p))
+
+
+def split_holdout(paths, holdout=5):
+    """Every ``holdout``-th image is held out for evaluation."""
+    calibration = [p for i, p in enumerate(paths) if i % holdout]
+    evaluation = [p for i, p in enumerate(paths) if not i % holdout]
+    return calibration, evaluation
+
+
+def write_calibration_dataset(paths, names, out_dir=CALIBRATION_DIR):
+    """Write a YOLO dataset YAML whose val split lists ``paths``.
+
+    The exporter only reads images from it, so no label files are needed.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    list_path = os.path.abspath(os.path.join(out_dir, "images.txt"))
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.writelines(os.path.abspath(p) + "\n" for p in paths)
+    yaml_path = os.path.join(out_dir, "calibration.yaml")
+    with open(yaml_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(
+            {"train": list_path, "val": list_path, "names": dict(names)}, f
+        )
+    return yaml_path
+
+
+def _timed_predict(model, images, batch_size):
+    results = []
+    start = time.perf_counter()
+    for offset in range(0, len(images), batch_size):
+        results.extend(
+            model.predict(images[offset : offset + batch_size], verbose=False)
+        )
+    return results, (time.perf_counter() - start) * 1000 / max(len(images), 1)
+
+
+def evaluate_int8(fp32_model, int8_model, images, batch_size=8):
+    """Agreement of the INT8 model with FP32 plus the ms/image of both."""
+    # Warm up both runtimes so the first call's setup is not timed
+    _timed_predict(fp32_model, images[:1], 1)
+    _timed_predict(int8_model, images[:1], 1)
+    fp32_results, fp32_ms = _timed_predict(fp32_model, images, batch_size)
+    int8_results, int8_ms = _timed_predict(int8_model, images, batch_size)
+
+    report = compare_results(fp32_results, int8_results)
+    report["images"] = len(images)
+    report["passed"] = (
+        report["recall"] >= INT8_MIN_MATCH
+        and report["precision"] >= INT8_MIN_MATCH
+        and report["max_conf_diff"] <= INT8_MAX_CONF_DIFF
+    )
+    report["fp32_ms_per_image"] = fp32_ms
+    report["int8_ms_per_image"] = int8_ms
+    report["speedup"] = fp32_ms / int8_ms if int8_ms else 0.0
+    return report
+
+
+def quantize(weights, calibration_paths, evaluation_paths):
+    """Export one ``.pt`` file to INT8 OpenVINO and write its report."""
+    fp32_model = YOLO(weights).to("cpu")
+    data = write_calibration_dataset(calibration_paths, fp32_model.names)
+    int8_path = export_model(weights, "openvino", int8=True, data=data)
+
+    report = evaluate_int8(
+        fp32_model, YOLO(int8_path, task="detect"), read_images(evaluation_paths)
+    )
+    report["calibration_images"] = len(calibration_paths)
+    with open(parity_report_path(int8_path), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(
+        f"[INFO] {int8_path}: {format_report(report)}; "
+        f"{report['fp32_ms_per_image']:.1f} -> {report['int8_ms_per_image']:.1f} "
+        f"ms/image ({report['speedup']:.2f}x)"
+    )
+    return report
+
+
+def main(argv=None):
+    from detect_page.engine import PROFILES, create_db_engine, weights_path
+
+    parser = argparse.ArgumentParser(
+        description="Build INT8 OpenVINO models calibrated on our own screenshots."
+    )
+    parser.add_argument("--profile", default="cpu-n", choices=sorted(PROFILES))
+    parser.add_argument("--screenshots", default="screenshots")
+    parser.add_argument(
+        "--db",
+        action="store_true",
+        help="Also calibrate on the images referenced by final_defect",
+    )
+    parser.add_argument(
+        "--holdout",
+        type=int,
+        default=5,
+        help="Keep every Nth image out of calibration for the accuracy check",
+    )
+    args = parser.parse_args(argv)
+
+    paths = screenshot_images(args.screenshots)
+    if args.db:
+        paths = sorted(set(paths) | set(final_defect_images(create_db_engine())))
+    calibration_paths, evaluation_paths = split_holdout(paths, args.holdout)
+    if not calibration_paths or not evaluation_paths:
+        print(f"[ERROR] Not enough calibration images ({len(paths)} found).")
+        return 1
+    print(
+        f"[INFO] {len(calibration_paths)} calibration / "
+        f"{len(evaluation_paths)} evaluation images"
+    )
+
+    profile = PROFILES[args.profile]
+    passed = True
+    for weights in (profile.anomaly_weights, profile.defect_weights):
+        report = quantize(weights_path(weights), calibration_paths, evaluation_paths)
+        passed = passed and report["passed"]
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
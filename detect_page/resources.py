@@ -0,0 +1,82 @@
+"""
+Shared, lazily created models and database engine.
+
+Importing the detection pages no longer loads weights, torch or the
+database. The first request for a profile's models (or a single weights
+file) starts loading them on a background thread and returns a Future.
+Every later caller gets that same Future, so a page can start the warm-up
+when it is built. Pages never block on it: they continue from a done
+callback through a queued Qt signal. A load that failed is retried on the
+next request. With INFERENCE_SERVER set the "models" are clients of
+detect_page.inference_server.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_lock = threading.Lock()
+_executor = None
+_futures = {}
+_db_engine = None
+
+
+def _submit(key, func, *args):
+    global _executor
+    with _lock:
+        future = _futures.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            if _executor is None:
+                # One loader: torch imports and CUDA init do not gain from
+                # running in parallel
+                _executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="model-warm-up"
+                )
+            future = _executor.submit(func, *args)
+            _futures[key] = future
+        return future
+
+
+def _load_profile_models(profile):
+    from detect_page.engine import load_models
+
+    return load_models(profile)
+
+
+def _load_single_model(weights_file, device):
+    from detect_page.backends import load_model
+    from detect_page.engine import resolve_device, weights_path
+    from detect_page.inference_server import RemoteModel, server_address
+
+    remote = server_address()
+    if remote is not None:
+        return RemoteModel((weights_file, "torch", device, False), *remote)
+    device = resolve_device(device)
+    print(f"[INFO] Loading {weights_file} on {device}")
+    return load_model(weights_path(weights_file), "torch", device)
+
+
+def models_future(profile):
+    """Future of ``(anomaly_model, defect_model)`` for a DetectionProfile."""
+    key = ("profile", profile.name, profile.backend, profile.int8, profile.device)
+    return _submit(key, _load_profile_models, profile)
+
+
+def model_future(weights_file, device="auto"):
+    """Future of a single PyTorch YOLO model from the weights folder."""
+    return _submit(
+        ("model", weights_file, device), _load_single_model, weights_file, device
+    )
+
+
+def get_db_engine():
+    """Return the shared SQLAlchemy engine, creating it on first use.
+
+    Raises ValueError when DB_URL is missing from .env.
+    """
+    global _db_engine
+    with _lock:
+        if _db_engine is None:
+            from detect_page.engine import create_db_engine
+
+            _db_engine = create_db_engine()
+        return _db_engine
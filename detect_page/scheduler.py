@@ -0,0 +1,135 @@
+"""
+Frame scheduling for the detection pipeline.
+
+Policies:
+
+- ``realtime``: follow the video clock. When inference falls behind, the
+  decoder skips frames with ``grab()``, which never converts the frame and
+  never seeks. ``CAP_PROP_POS_FRAMES`` seeks on FFmpeg captures often cost
+  more than the frames they skip.
+- ``latest``: decode every frame on the video clock, but keep only the
+  newest frames waiting for inference. Older waiting frames are dropped.
+- ``every``: process every frame as fast as possible (offline review).
+
+Frames that the frame-difference gate (detect_page.gating) let through
+without inference are counted as ``gated``. ``gate_skip_ratio`` is their
+share of the processed frames.
+
+``max_latency`` (seconds) bounds how old a decoded frame may be when
+inference picks it up under ``realtime`` and ``latest``. Older frames are
+dropped and counted.
+"""
+
+import threading
+import time
+
+SCHEDULE_POLICIES = ("realtime", "latest", "every")
+
+
+class FrameScheduler:
+    """Decides when the decoder reads, waits or skips, and counts what happened."""
+
+    def __init__(self, policy="realtime", max_latency=0.5):
+        if policy not in SCHEDULE_POLICIES:
+            raise ValueError(f"Unknown schedule policy: {policy}")
+        self.policy = policy
+        self.max_latency = max_latency
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.decoded = 0
+            self.skipped = 0
+            self.dropped = 0
+            self.processed = 0
+            self.gated = 0
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+
+    @property
+    def paced(self):
+        """Whether frames are released on the video clock."""
+        return self.policy != "every"
+
+    @property
+    def keep_latest(self):
+        return self.policy == "latest"
+
+    def wait_time(self, frame_index, elapsed, frame_duration):
+        """Seconds to wait before ``frame_index`` is due."""
+        if not self.paced:
+            return 0.0
+        return max(0.0, frame_index * frame_duration - elapsed)
+
+    def frames_to_skip(self, frame_index, elapsed, frame_duration):
+        """Frames to grab() and discard before reading, to catch up with the clock."""
+        if self.policy != "realtime":
+            return 0
+        expected_frame_index = int(elapsed / frame_duration)
+        return max(0, expected_frame_index - frame_index)
+
+    def is_stale(self, packet, now=None):
+        """True when a decoded frame waited longer than ``max_latency``."""
+        if self.policy == "every" or self.max_latency is None:
+            return False
+        now = time.time() if now is None else now
+        return now - packet["decoded_at"] > self.max_latency
+
+    def record_decoded(self):
+        with self._lock:
+            self.decoded += 1
+
+    def record_skipped(self, count):
+        with self._lock:
+            self.skipped += count
+
+    def record_dropped(self, count=1):
+        with self._lock:
+            self.dropped += count
+
+    def record_gated(self, count=1):
+        with self._lock:
+            self.gated += count
+
+    def record_processed(self, latency):
+        with self._lock:
+            self.processed += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def summary(self):
+        """Per-run statistics of dropped versus processed frames."""
+        with self._lock:
+            wall_time = time.time() - self.started_at
+            return {
+                "policy": self.policy,
+                "decoded": self.decoded,
+                "skipped": self.skipped,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "gated": self.gated,
+                "gate_skip_ratio": (
+                    self.gated / self.processed if self.processed else 0.0
+                ),
+                "avg_latency_ms": (
+                    self.latency_total / self.processed * 1000
+                    if self.processed
+                    else 0.0
+                ),
+                "max_latency_ms": self.latency_max * 1000,
+                "processing_fps": self.processed / wall_time if wall_time > 0 else 0.0,
+            }
+
+
+def format_summary(summary):
+    """One-line, human readable version of ``FrameScheduler.summary()``."""
+    return (
+        f"policy={summary['policy']} processed={summary['processed']} "
+        f"skipped={summary['skipped']} dropped={summary['dropped']} "
+        f"gated={summary['gated']} ({summary['gate_skip_ratio']:.0%}) "
+        f"fps={summary['processing_fps']:.2f} "
+        f"latency avg={summary['avg_latency_ms']:.1f} ms "
+        f"max={summary['max_latency_ms']:.1f} ms"
+    )
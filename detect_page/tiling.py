@@ -0,0 +1,95 @@
+"""
+Tiled inference on native-resolution frames.
+
+Squeezing a wide strip frame into 640x640 shrinks small pits and dents to a
+few pixels. Tiler cuts the native frame into overlapping ``tile_size``
+tiles, sends the tiles of all frames through the model in batches of
+``batch_size`` and merges the per-tile boxes with a cross-tile NMS.
+Detections come back in the usual 640x640 model space of the full frame,
+with float coordinates so that boxes of a few native pixels survive the
+scaling.
+"""
+
+import time
+
+from detect_page.detections import DetectionBatch
+from detect_page.pipeline import YOLO_INPUT_SIZE, nms_detections
+
+INFERENCE_MODES = ("resize", "tiled")
+
+
+def _starts(length, tile, stride):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    # The last tile is aligned to the far edge
+    starts.append(length - tile)
+    return starts
+
+
+def tile_grid(width, height, tile_size=640, overlap=0.2):
+    """Tile boxes (x0, y0, x1, y1) covering a ``width`` x ``height`` frame."""
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+    return [
+        (x0, y0, min(width, x0 + tile_size), min(height, y0 + tile_size))
+        for y0 in _starts(height, tile_size, stride)
+        for x0 in _starts(width, tile_size, stride)
+    ]
+
+
+class Tiler:
+    """
+    Runs a detection model over overlapping tiles of each frame.
+
+    ``overlap`` is the fraction shared by neighbouring tiles and should be
+    larger than the biggest defect relative to the tile. ``batch_size`` is the
+    number of tiles per predict() call, which trades memory for throughput.
+    """
+
+    def __init__(self, tile_size=640, overlap=0.2, batch_size=16, iou_threshold=0.5):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.batch_size = max(1, batch_size)
+        self.iou_threshold = iou_threshold
+
+    def predict(self, model, frames, conf_threshold=0.0):
+        """Return ``[(detections, total_time_ms)]``, one entry per frame."""
+        start = time.perf_counter()
+        tiles = []  # (frame index, x0, y0, tile image)
+        for index, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            for x0, y0, x1, y1 in tile_grid(
+                width, height, self.tile_size, self.overlap
+            ):
+                tiles.append((index, x0, y0, frame[y0:y1, x0:x1]))
+
+        per_frame = [[] for _ in frames]
+        for offset in range(0, len(tiles), self.batch_size):
+            chunk = tiles[offset : offset + self.batch_size]
+            results = model.predict(
+                [tile for _, _, _, tile in chunk],
+                imgsz=self.tile_size,
+                verbose=False,
+            )
+            for (index, tx0, ty0, _), result in zip(chunk, results):
+                height, width = frames[index].shape[:2]
+                per_frame[index].append(
+                    DetectionBatch.from_result(
+                        result, model.names, conf_threshold, truncate=False
+                    ).translated(
+                        tx0, ty0, YOLO_INPUT_SIZE / width, YOLO_INPUT_SIZE / height
+                    )
+                )
+
+        total_time = (time.perf_counter() - start) * 1000 / max(len(frames), 1)
+        return [
+            # Boxes split by a tile border overlap their full copy mostly,
+            # so suppress by intersection over the smaller box
+            (
+                nms_detections(
+                    DetectionBatch.concat(batches), self.iou_threshold, metric="ios"
+                ),
+                total_time,
+            )
+            for batches in per_frame
+        ]
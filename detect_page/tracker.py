@@ -0,0 +1,261 @@
+"""
+Lightweight ByteTrack-style multi-object tracker for anomaly detections.
+
+Every box gets a constant-velocity Kalman filter. Each frame:
+
+1. Confident detections are matched to all tracks by IoU (Hungarian
+   assignment).
+2. Low-confidence detections are matched to the confirmed tracks that are
+   still unmatched, so a defect that briefly fades keeps its identity.
+3. Unconfirmed tracks have no velocity yet, so a fast defect has moved off
+   its first box by the next frame. Those still unmatched are paired with
+   the remaining confident detections by center distance (at most
+   ``birth_distance`` box sizes per frame), which also sets their velocity.
+
+A track is confirmed after ``min_hits`` matches and forgotten after
+``max_age`` processed frames without one; an unconfirmed track survives
+``tentative_age`` frames without a match. Confirmed tracks keep a stable
+``track_id`` and a ULID (``uid``) for the whole time the defect is visible.
+Coordinates are in 640x640 model space.
+"""
+
+import numpy as np
+import ulid
+from scipy.optimize import linear_sum_assignment
+
+
+def _to_cxcywh(box):
+    x0, y0, x1, y1 = box
+    return np.array([(x0 + x1) / 2, (y0 + y1) / 2, x1 - x0, y1 - y0], dtype=float)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of two (N, 4) / (M, 4) xyxy arrays."""
+    a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter over (cx, cy, w, h)."""
+
+    _F = np.eye(8) + np.eye(8, k=4)
+    _H = np.eye(4, 8)
+    _Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001, 0.0001])
+    _R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+    def __init__(self, box):
+        self.x = np.zeros(8)
+        self.x[:4] = _to_cxcywh(box)
+        # Unknown velocity at birth
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4, 1e4])
+
+    def predict(self):
+        self.x = self._F @ self.x
+        self.x[2:4] = np.maximum(self.x[2:4], 1.0)
+        self.P = self._F @ self.P @ self._F.T + self._Q
+
+    def update(self, box):
+        y = _to_cxcywh(box) - self._H @ self.x
+        S = self._H @ self.P @ self._H.T + self._R
+        K = self.P @ self._H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(8) - K @ self._H) @ self.P
+
+    def box(self):
+        cx, cy, w, h = self.x[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class Track:
+    """One tracked defect; ``box`` is its latest matched box."""
+
+    def __init__(self, track_id, class_id, box):
+        self.track_id = track_id
+        self.uid = str(ulid.new())
+        self.class_id = class_id
+        self.box = box  # (x0, y0, x1, y1)
+        self.row = None  # Row of the matched box in the current frame's batch
+        self.kalman = KalmanBoxFilter(box)
+        self.hits = 1
+        self.time_since_update = 0
+        self.confirmed = False
+
+    @property
+    def velocity(self):
+        """Estimated center motion (dx, dy) per processed frame."""
+        return float(self.kalman.x[4]), float(self.kalman.x[5])
+
+    def predict(self):
+        self.kalman.predict()
+        self.time_since_update += 1
+
+    def update(self, box, row):
+        self.kalman.update(box)
+        self.box = box
+        self.row = row
+        self.hits += 1
+        self.time_since_update = 0
+
+    def follow(self, box, row):
+        """Match a box away from the first one; its shift sets the velocity."""
+        shift = (_to_cxcywh(box) - _to_cxcywh(self.box))[:2]
+        self.kalman = KalmanBoxFilter(box)
+        self.kalman.x[4:6] = shift / max(self.time_since_update, 1)
+        self.box = box
+        self.row = row
+        self.hits += 1
+        self.time_since_update = 0
+
+
+class ByteTracker:
+    """
+    Assigns persistent track IDs to the boxes of a DetectionBatch per frame.
+
+    ``update(detections)`` fills the batch's ``track_id``/``track_uid``
+    columns (-1/None while a box's track is unconfirmed) and returns the
+    confirmed tracks seen in this frame. Confidences are in percent, like
+    the batch; new tracks start from detections of at least ``high_conf``,
+    which the engine sets to the run's confidence threshold.
+    """
+
+    def __init__(
+        self,
+        high_conf=50.0,
+        low_conf=10.0,
+        match_iou=0.3,
+        low_match_iou=0.5,
+        min_hits=2,
+        max_age=30,
+        tentative_age=1,
+        birth_distance=1.5,
+    ):
+        self.high_conf = high_conf
+        self.low_conf = low_conf
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.tentative_age = tentative_age
+        self.birth_distance = birth_distance
+        self.reset()
+
+    def reset(self):
+        self.tracks = []
+        self._next_id = 1
+
+    def _associate(self, tracks, boxes, class_ids, min_iou):
+        """Hungarian matching on IoU; returns (matches, unmatched track/box indices)."""
+        if not tracks or not len(boxes):
+            return [], list(range(len(tracks))), list(range(len(boxes)))
+        iou = iou_matrix([t.kalman.box() for t in tracks], boxes)
+        # Never match across classes
+        same_class = np.array([t.class_id for t in tracks])[:, None] == class_ids
+        iou = np.where(same_class, iou, 0.0)
+        rows, cols = linear_sum_assignment(-iou)
+        matches = [(r, c) for r, c in zip(rows, cols) if iou[r, c] >= min_iou]
+        matched_tracks = {r for r, _ in matches}
+        matched_boxes = {c for _, c in matches}
+        return (
+            matches,
+            [i for i in range(len(tracks)) if i not in matched_tracks],
+            [i for i in range(len(boxes)) if i not in matched_boxes],
+        )
+
+    def _associate_tentative(self, tracks, boxes, class_ids):
+        """Match unconfirmed tracks by center distance; returns (matches, unmatched)."""
+        if not tracks or not len(boxes):
+            return [], list(range(len(boxes)))
+        first = np.array([_to_cxcywh(t.box) for t in tracks])
+        current = np.array([_to_cxcywh(box) for box in boxes]).reshape(-1, 4)
+        distance = np.linalg.norm(first[:, None, :2] - current[None, :, :2], axis=2)
+        # In box sizes per processed frame since the track was last seen
+        reach = (
+            self.birth_distance
+            * first[:, 2:].max(axis=1)
+            * np.array([t.time_since_update for t in tracks])
+        )
+        allowed = (distance <= reach[:, None]) & (
+            np.array([t.class_id for t in tracks])[:, None] == class_ids
+        )
+        rows, cols = linear_sum_assignment(np.where(allowed, distance, 1e9))
+        matches = [(r, c) for r, c in zip(rows, cols) if allowed[r, c]]
+        matched = {c for _, c in matches}
+        return matches, [i for i in range(len(boxes)) if i not in matched]
+
+    def update(self, detections):
+        for track in self.tracks:
+            track.predict()
+            track.row = None
+
+        confidence = detections.confidence
+        high = np.flatnonzero(confidence >= self.high_conf)
+        low = np.flatnonzero(
+            (confidence >= self.low_conf) & (confidence < self.high_conf)
+        )
+        boxes = detections.boxes.tolist()
+        class_ids = detections.class_id
+
+        matches, unmatched_tracks, unmatched_high = self._associate(
+            self.tracks, detections.boxes[high], class_ids[high], self.match_iou
+        )
+        for t, d in matches:
+            self.tracks[t].update(boxes[high[d]], high[d])
+
+        # Second pass: keep confirmed tracks alive through low-confidence frames
+        remaining = [
+            self.tracks[i] for i in unmatched_tracks if self.tracks[i].confirmed
+        ]
+        matches, _, _ = self._associate(
+            remaining, detections.boxes[low], class_ids[low], self.low_match_iou
+        )
+        for t, d in matches:
+            remaining[t].update(boxes[low[d]], low[d])
+
+        # Third pass: unconfirmed tracks that moved too far for any IoU
+        tentative = [
+            self.tracks[i] for i in unmatched_tracks if not self.tracks[i].confirmed
+        ]
+        unmatched_rows = high[unmatched_high]
+        matches, unmatched = self._associate_tentative(
+            tentative, detections.boxes[unmatched_rows], class_ids[unmatched_rows]
+        )
+        for t, d in matches:
+            tentative[t].follow(boxes[unmatched_rows[d]], unmatched_rows[d])
+
+        for row in unmatched_rows[unmatched]:
+            track = Track(self._next_id, int(class_ids[row]), boxes[row])
+            track.row = row
+            self.tracks.append(track)
+            self._next_id += 1
+
+        alive = []
+        for track in self.tracks:
+            if track.time_since_update == 0 and track.hits >= self.min_hits:
+                track.confirmed = True
+            if track.time_since_update == 0:
+                alive.append(track)
+            elif track.confirmed and track.time_since_update <= self.max_age:
+                alive.append(track)
+            elif track.time_since_update <= self.tentative_age:
+                alive.append(track)
+        self.tracks = alive
+
+        track_id = np.full(len(detections), -1, np.int32)
+        track_uid = np.full(len(detections), None, object)
+        visible = []
+        for track in self.tracks:
+            if track.confirmed and track.time_since_update == 0:
+                track_id[track.row] = track.track_id
+                track_uid[track.row] = track.uid
+                visible.append(track)
+        detections.track_id = track_id
+        detections.track_uid = track_uid
+        return visible
@@ -1,16 +1,20 @@
 from PySide6.QtCore import QCoreApplication, QMetaObject, QRect, QSize, Qt
 from PySide6.QtWidgets import (
+    QAbstractItemView,
     QFrame,
+    QHeaderView,
     QHBoxLayout,
     QLabel,
     QPushButton,
     QSizePolicy,
     QSlider,  # Tambahkan ini
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
 )
 
+from detect_page.detection_table import DetectionTableModel
+from detect_page.frame_view import FrameView
+
 
 class Ui_detectWidget(object):
     def __init__(self):
@@ -19,10 +23,12 @@ class Ui_detectWidget(object):
         self.duration_label = None
         self.processing_time_label = None
         self.fps_label = None
+        self.defect_queue_label = None
         self.select_and_detect_video = None
         self.pause_button = None
         self.stop_button = None
-        self.table_widget = None
+        self.table_view = None
+        self.table_model = None
         self.main_horizontal_layout = None
         self.left_panel_layout = None
         self.horizontal_frame = None
@@ -86,7 +92,7 @@ class Ui_detectWidget(object):
     def _create_widgets(self, detectWidget):
         """Creates all widgets."""
         # Create Image Label
-        self.detection_image_label = QLabel(detectWidget)
+        self.detection_image_label = FrameView(detectWidget)
         self.detection_image_label.setObjectName("detectionImageLabel")
 
         # Create Status Labels
@@ -96,6 +102,8 @@ class Ui_detectWidget(object):
         self.processing_time_label.setObjectName("processingTimeLabel")
         self.fps_label = QLabel(detectWidget)
         self.fps_label.setObjectName("fpsLabel")
+        self.defect_queue_label = QLabel(detectWidget)
+        self.defect_queue_label.setObjectName("defectQueueLabel")
 
         # Create Buttons
         self.select_and_detect_video = QPushButton(self.horizontal_frame)
@@ -106,8 +114,9 @@ class Ui_detectWidget(object):
         self.stop_button.setObjectName("stopButton")
 
         # Create Table
-        self.table_widget = QTableWidget(detectWidget)
-        self.table_widget.setObjectName("tableWidget")
+        self.table_view = QTableView(detectWidget)
+        self.table_view.setObjectName("tableView")
+        self.table_model = DetectionTableModel(self.table_view)
 
         # Tambahkan slider confidence
         self.confidence_label = QLabel(detectWidget)
@@ -134,28 +143,28 @@ class Ui_detectWidget(object):
         # Configure Status Labels
         self.processing_time_label.setAlignment(Qt.AlignCenter)
         self.fps_label.setAlignment(Qt.AlignCenter)
+        self.defect_queue_label.setAlignment(Qt.AlignCenter)
 
         # Configure Table
-        self.table_widget.setMinimumSize(QSize(320, 0))
+        self.table_view.setMinimumSize(QSize(320, 0))
 
     def _configure_table(self):
-        """Configures the table widget."""
-        self.table_widget.setColumnCount(8)
-        header_labels = ["No.", "Box Id", "Class", "Confidence", "x-center", "y-center", "width", "height"]
-
-        for i, label in enumerate(header_labels):
-            item = QTableWidgetItem()
-            self.table_widget.setHorizontalHeaderItem(i, item)
-            item.setText(QCoreApplication.translate("detectWidget", label, None))
-
-        self.table_widget.setColumnWidth(0, self.fixed_width_no)
-        self.table_widget.setColumnWidth(1, self.fixed_width_box_id)
-        self.table_widget.setColumnWidth(2, self.fixed_width_class)
-        self.table_widget.setColumnWidth(3, self.fixed_width_conf)
-        self.table_widget.setColumnWidth(4, self.fixed_width_coord)
-        self.table_widget.setColumnWidth(5, self.fixed_width_coord)
-        self.table_widget.setColumnWidth(6, self.fixed_width_coord)
-        self.table_widget.setColumnWidth(7, self.fixed_width_coord)
+        """Configures the table view; columns come from DetectionTableModel."""
+        self.table_view.setModel(self.table_model)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # Fixed row height, so updates never trigger a resize to contents
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.verticalHeader().setVisible(False)
+
+        self.table_view.setColumnWidth(0, self.fixed_width_no)
+        self.table_view.setColumnWidth(1, self.fixed_width_box_id)
+        self.table_view.setColumnWidth(2, self.fixed_width_class)
+        self.table_view.setColumnWidth(3, self.fixed_width_conf)
+        self.table_view.setColumnWidth(4, self.fixed_width_coord)
+        self.table_view.setColumnWidth(5, self.fixed_width_coord)
+        self.table_view.setColumnWidth(6, self.fixed_width_coord)
+        self.table_view.setColumnWidth(7, self.fixed_width_coord)
 
     def _setup_layout_hierarchy(self):
         """Sets up the hierarchy of layouts and widgets."""
@@ -164,6 +173,7 @@ class Ui_detectWidget(object):
         self.left_panel_layout.addWidget(self.duration_label)
         self.left_panel_layout.addWidget(self.processing_time_label)
         self.left_panel_layout.addWidget(self.fps_label)
+        self.left_panel_layout.addWidget(self.defect_queue_label)
 
         # Add buttons to button layout
         self.button_layout.addWidget(self.select_and_detect_video)
@@ -177,7 +187,7 @@ class Ui_detectWidget(object):
 
         # Add main layouts to horizontal layout
         self.main_horizontal_layout.addLayout(self.left_panel_layout)
-        self.main_horizontal_layout.addWidget(self.table_widget)
+        self.main_horizontal_layout.addWidget(self.table_view)
 
     def retranslate_ui(self, detectWidget):
         """Sets up all the UI text."""
@@ -196,6 +206,9 @@ class Ui_detectWidget(object):
         self.fps_label.setText(
             QCoreApplication.translate("detectWidget", "FPS: N/A", None)
         )
+        self.defect_queue_label.setText(
+            QCoreApplication.translate("detectWidget", "Defect Queue: 0", None)
+        )
         self.select_and_detect_video.setText(
             QCoreApplication.translate("detectWidget", "Select and Detect Video", None)
         )
@@ -5,9 +5,13 @@ from general_function.query import log_out_session
 
 def handle_logout(self):
     """Handle user logout and reset session attributes."""
+    from detect_page.image_writer import flush_image_writers
     from login_page.login_page import setup_login_page
 
     try:
+        # Finish writing queued screenshots before the session ends
+        flush_image_writers()
+
         # Log out the current session if it exists
         if hasattr(self, "id_operation") and self.id_operation:
             log_out_session(self.id_operation)